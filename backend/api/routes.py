@@ -1,10 +1,17 @@
+import hashlib
+import heapq
 import json
+import time
 import uuid
 from datetime import datetime
-from typing import Optional
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-import redis
+import orjson
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 
 from config import settings
 from models.schemas import (
@@ -14,13 +21,11 @@ from models.schemas import (
     JobStatusResponse,
     UploadImageResponse,
     VideoLibraryResponse,
-    VideoLibraryItem,
     CostEstimateResponse,
     ErrorResponse,
     JobStatus,
     Provider,
     Model,
-    Strategy,
     APIKeysRequest,
     ValidateKeyRequest,
     ValidateKeyResponse,
@@ -29,25 +34,39 @@ from models.schemas import (
     KeyType,
 )
 from services.storage_manager import StorageManager
+from services import session_store
 from services.image_processor import image_processor
-from tasks.video_processor import process_video_pipeline, get_session_data, update_job_status
+from tasks.video_processor import process_video_pipeline, update_job_status
 from services.pipeline_logger import PipelineLogger
 
 router = APIRouter()
 
-# Redis client
-redis_client = redis.from_url(settings.redis_url)
+# Async Redis client (str responses), one sized pool shared with the session store
+redis_client = session_store.redis_client
 
-# Cost map for estimates (per request)
+# Cost map for estimates (per request), keyed by "provider:model"
 COST_PER_8S = {
-    (Provider.KIE_AI, Model.VEO_31_FAST): 0.40,
-    (Provider.KIE_AI, Model.VEO_31_QUALITY): 2.00,
-    (Provider.KIE_AI, Model.SORA_2): 0.15,
-    (Provider.DEFAPI, Model.DEFAPI_VEO_31): 0.50,  # $0.5 per request
-    (Provider.DEFAPI, Model.DEFAPI_SORA_2): 0.10,  # $0.1 per request
+    f"{Provider.KIE_AI.value}:{Model.VEO_31_FAST.value}": 0.40,
+    f"{Provider.KIE_AI.value}:{Model.VEO_31_QUALITY.value}": 2.00,
+    f"{Provider.KIE_AI.value}:{Model.SORA_2.value}": 0.15,
+    f"{Provider.DEFAPI.value}:{Model.DEFAPI_VEO_31.value}": 0.50,  # $0.5 per request
+    f"{Provider.DEFAPI.value}:{Model.DEFAPI_SORA_2.value}": 0.10,  # $0.1 per request
 }
 
 
+# google.generativeai is slow to import (protobuf init), loaded once and pre-warmed on startup
+_genai = None
+
+
+def get_genai():
+    """Return the google.generativeai module, importing it on first use"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        _genai = genai
+    return _genai
+
+
 def get_storage() -> StorageManager:
     """Dependency to get storage manager"""
     return StorageManager()
@@ -59,6 +78,8 @@ def get_storage() -> StorageManager:
 async def create_session(request: CreateSessionRequest):
     """Create a new video clone session"""
     session_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    now_iso = now.isoformat()
 
     # Store session in Redis
     session_data = {
@@ -70,19 +91,14 @@ async def create_session(request: CreateSessionRequest):
         "model": request.model.value,
         "strategy": request.strategy.value,
         "status": JobStatus.PENDING.value,
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
+        "created_at": now_iso,
+        "updated_at": now_iso,
         "scene_count": 0,
         "total_cost": 0.0,
     }
 
-    redis_client.hset(f"session:{session_id}", mapping={
-        k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
-        for k, v in session_data.items()
-    })
-
-    # Add to sessions list
-    redis_client.sadd("sessions", session_id)
+    # All fields are scalars, so they can be stored as-is
+    await session_store.save(session_id, session_data, created_at=now)
 
     return SessionResponse(
         session_id=session_id,
@@ -93,8 +109,8 @@ async def create_session(request: CreateSessionRequest):
         model=request.model,
         strategy=request.strategy,
         status=JobStatus.PENDING,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
+        created_at=now,
+        updated_at=now,
     )
 
 
@@ -111,72 +127,116 @@ def transform_video_urls(variants: list, session_id: str) -> list:
     return variants
 
 
-@router.get("/sessions/{session_id}", response_model=SessionResponse)
-async def get_session(session_id: str):
-    """Get session details"""
-    if not redis_client.exists(f"session:{session_id}"):
-        raise HTTPException(status_code=404, detail="Session not found")
+def _parse_timestamp(value: Optional[str]) -> datetime:
+    """Parse a stored ISO timestamp, falling back to now if missing"""
+    if value:
+        return datetime.fromisoformat(value)
+    return datetime.utcnow()
+
 
-    data = get_session_data(session_id)
+def _clip_row(clip: dict) -> dict:
+    """Stored clip reduced to the ClipInfo keys (drops cost, error, target_duration)"""
+    return {
+        "clip_index": clip.get("clip_index"),
+        "scene_index": clip.get("scene_index"),
+        "duration": clip.get("duration"),
+        "prompt": clip.get("prompt"),
+        "video_url": clip.get("video_url"),
+        "status": clip.get("status", "pending"),
+    }
+
+
+def _variant_row(variant: dict) -> dict:
+    """Stored variant reduced to the VariantInfo keys"""
+    return {
+        "variant_index": variant.get("variant_index"),
+        "clips": [_clip_row(clip) for clip in variant.get("clips", [])],
+        "status": variant.get("status", "pending"),
+        "total_cost": variant.get("total_cost", 0.0),
+    }
 
+
+def session_row(session_id: str, data: dict) -> dict:
+    """Plain dict in SessionResponse shape, built from trusted session data"""
     # Transform Google Drive URLs to proxy URLs
     variants = data.get("variants", [])
     if isinstance(variants, str):
         variants = json.loads(variants)
     variants = transform_video_urls(variants, session_id)
 
-    return SessionResponse(
-        session_id=session_id,
-        tiktok_url=data.get("tiktok_url", ""),
-        product_name=data.get("product_name", ""),
-        num_variants=int(data.get("num_variants", 1)),
-        provider=Provider(data.get("provider", "kie.ai")),
-        model=Model(data.get("model", "veo-3.1-fast")),
-        strategy=Strategy(data.get("strategy", "segments")),
-        status=JobStatus(data.get("status", "pending")),
-        created_at=datetime.fromisoformat(data.get("created_at", datetime.utcnow().isoformat())),
-        updated_at=datetime.fromisoformat(data.get("updated_at", datetime.utcnow().isoformat())),
-        original_video_url=data.get("original_video_url"),
-        product_image_url=data.get("product_image_url"),
-        scene_count=int(data.get("scene_count", 0)),
-        variants=variants,
-        total_cost=float(data.get("total_cost", 0.0)),
-        error_message=data.get("error"),
-    )
+    return {
+        "session_id": session_id,
+        "tiktok_url": data.get("tiktok_url", ""),
+        "product_name": data.get("product_name", ""),
+        "num_variants": int(data.get("num_variants", 1)),
+        "provider": data.get("provider", "kie.ai"),
+        "model": data.get("model", "veo-3.1-fast"),
+        "strategy": data.get("strategy", "segments"),
+        "status": data.get("status", "pending"),
+        "created_at": _parse_timestamp(data.get("created_at")),
+        "updated_at": _parse_timestamp(data.get("updated_at")),
+        "original_video_url": data.get("original_video_url"),
+        "product_image_url": data.get("product_image_url"),
+        "scene_count": int(data.get("scene_count", 0)),
+        "variants": [_variant_row(variant) for variant in variants],
+        "total_cost": float(data.get("total_cost", 0.0)),
+        "error_message": data.get("error"),
+    }
+
+
+async def _load_or_404(session_id: str) -> dict:
+    """Load session data in one round-trip, 404 if the session does not exist"""
+    data = await session_store.load(session_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return data
+
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    """Get session details"""
+    data = await _load_or_404(session_id)
+
+    # Validated once by FastAPI against response_model
+    return session_row(session_id, data)
 
 
 @router.get("/sessions", response_model=SessionListResponse)
 async def list_sessions(limit: int = 20, offset: int = 0):
     """List all sessions"""
-    session_ids = list(redis_client.smembers("sessions"))
-    session_ids = [s.decode() if isinstance(s, bytes) else s for s in session_ids]
+    # Only the requested page is read from the created_at index (newest first)
+    page_ids = await session_store.list_page(offset, limit)
 
-    sessions = []
-    for sid in session_ids[offset:offset + limit]:
-        try:
-            session = await get_session(sid)
-            sessions.append(session)
-        except HTTPException:
-            continue
+    # Fetch all sessions of the page in a single round-trip
+    loaded = await session_store.load_many(page_ids)
+
+    # Row building is CPU work, keep it off the event loop
+    sessions = await run_in_threadpool(_session_rows, page_ids, loaded)
 
-    # Sort by created_at descending
-    sessions.sort(key=lambda x: x.created_at, reverse=True)
+    return ORJSONResponse({"sessions": sessions, "total": await session_store.count()})
 
-    return SessionListResponse(sessions=sessions, total=len(session_ids))
+
+def _session_rows(session_ids: list, loaded: list) -> list:
+    """Session rows for loaded sessions, skipping ones that no longer exist"""
+    # Stored data is trusted, so rows skip per-item Pydantic validation
+    return [
+        session_row(sid, data)
+        for sid, data in zip(session_ids, loaded)
+        if data is not None
+    ]
 
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(session_id: str, storage: StorageManager = Depends(get_storage)):
     """Delete a session and its videos"""
-    if not redis_client.exists(f"session:{session_id}"):
+    if not await session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Delete from storage
     storage.delete_session(session_id)
 
     # Delete from Redis
-    redis_client.delete(f"session:{session_id}")
-    redis_client.srem("sessions", session_id)
+    await session_store.delete(session_id)
 
     return {"message": "Session deleted", "session_id": session_id}
 
@@ -190,20 +250,22 @@ async def upload_product_image(
     storage: StorageManager = Depends(get_storage)
 ):
     """Upload product reference image for a session"""
-    if not redis_client.exists(f"session:{session_id}"):
+    if not await session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Read and save image
-    image_data = await file.read()
-    image_path = image_processor.save_product_image(
-        image_data,
+    # Stream image to disk (blocking file I/O runs in the threadpool)
+    image_path = await run_in_threadpool(
+        image_processor.save_product_image,
+        file.file,
         session_id,
         file.filename or "product.jpg"
     )
 
     # Store path in session
-    redis_client.hset(f"session:{session_id}", "product_image_path", image_path)
-    redis_client.hset(f"session:{session_id}", "product_image_url", image_path)
+    await session_store.update(session_id, {
+        "product_image_path": image_path,
+        "product_image_url": image_path,
+    })
 
     return UploadImageResponse(
         session_id=session_id,
@@ -217,10 +279,7 @@ async def upload_product_image(
 @router.post("/sessions/{session_id}/generate", response_model=JobStatusResponse)
 async def start_generation(session_id: str):
     """Start video generation for a session"""
-    if not redis_client.exists(f"session:{session_id}"):
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    data = get_session_data(session_id)
+    data = await _load_or_404(session_id)
 
     # Check if already processing
     if data.get("status") in ["downloading", "analyzing", "generating"]:
@@ -229,6 +288,9 @@ async def start_generation(session_id: str):
     # Get product image path
     product_image_path = data.get("product_image_path")
 
+    # Regenerating a completed session asks Gemini again instead of reusing the cached analysis
+    use_cache = data.get("status") != "completed"
+
     # Start Celery task
     process_video_pipeline.delay(
         session_id=session_id,
@@ -238,10 +300,12 @@ async def start_generation(session_id: str):
         num_variants=int(data["num_variants"]),
         provider=data["provider"],
         model=data["model"],
-        strategy=data["strategy"]
+        strategy=data["strategy"],
+        use_cache=use_cache
     )
 
-    update_job_status(session_id, status="pending", progress=0.0, current_step="Job queued")
+    # Shared with the worker (sync Redis), so keep it off the event loop
+    await run_in_threadpool(update_job_status, session_id, status="pending", progress=0.0, current_step="Job queued")
 
     return JobStatusResponse(
         session_id=session_id,
@@ -256,10 +320,7 @@ async def start_generation(session_id: str):
 @router.get("/sessions/{session_id}/status", response_model=JobStatusResponse)
 async def get_job_status(session_id: str):
     """Get current job status"""
-    if not redis_client.exists(f"session:{session_id}"):
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    data = get_session_data(session_id)
+    data = await _load_or_404(session_id)
 
     return JobStatusResponse(
         session_id=session_id,
@@ -281,52 +342,100 @@ async def get_video_library(
     storage: StorageManager = Depends(get_storage)
 ):
     """Get all generated videos from the library"""
-    session_ids = list(redis_client.smembers("sessions"))
-    session_ids = [s.decode() if isinstance(s, bytes) else s for s in session_ids]
+    await session_store.backfill_completed_index()
+
+    session_ids = await session_store.list_ids(session_store.COMPLETED_SESSIONS_KEY)
 
+    # Fetch all completed sessions in a single round-trip
+    loaded = await session_store.load_many(session_ids)
+
+    # Collecting and ordering all clips is CPU work, keep it off the event loop
+    videos, total = await run_in_threadpool(_library_page, session_ids, loaded, offset, limit)
+
+    return ORJSONResponse({"videos": videos, "total": total})
+
+
+def _library_page(session_ids: list, loaded: list, offset: int, limit: int) -> Tuple[list, int]:
+    """Library items of one page (newest first) and the total number of videos"""
+    # Lightweight (created_at, sid, variant_index, clip_index, clip, data) tuples,
+    # items are only built for the requested page
     all_videos = []
+    for sid, data in zip(session_ids, loaded):
+        all_videos.extend(_library_entries(sid, data))
 
-    for sid in session_ids:
-        try:
-            data = get_session_data(sid)
-            if data.get("status") != "completed":
-                continue
-
-            variants = data.get("variants", [])
-            if isinstance(variants, str):
-                variants = json.loads(variants)
-
-            for variant in variants:
-                for clip in variant.get("clips", []):
-                    if clip.get("video_url"):
-                        # Transform Google Drive URLs to proxy URLs
-                        video_url = clip["video_url"]
-                        if video_url.startswith("https://drive.google.com"):
-                            # Convert to proxy URL
-                            filename = f"variant_{str(clip['clip_index']).zfill(3)}.mp4"
-                            video_url = f"/api/v1/videos/{sid}/{filename}"
-
-                        all_videos.append(VideoLibraryItem(
-                            session_id=sid,
-                            variant_index=variant["variant_index"],
-                            clip_index=clip["clip_index"],
-                            video_url=video_url,
-                            product_name=data.get("product_name", ""),
-                            created_at=datetime.fromisoformat(data.get("created_at", datetime.utcnow().isoformat())),
-                            duration=clip.get("duration", 0.0),
-                            provider=Provider(data.get("provider", "kie.ai")),
-                            model=Model(data.get("model", "veo-3.1-fast"))
-                        ))
-        except Exception:
-            continue
+    # Newest first, only the first offset + limit entries are ordered
+    page = heapq.nlargest(offset + limit, all_videos, key=itemgetter(0))[offset:]
 
-    # Sort by created_at descending
-    all_videos.sort(key=lambda x: x.created_at, reverse=True)
+    return [_library_item(*entry) for entry in page], len(all_videos)
+
+
+@router.get("/library/export")
+async def export_video_library():
+    """Export all generated videos as one streamed JSON document"""
+    await session_store.backfill_completed_index()
+    return StreamingResponse(_stream_library(), media_type="application/json")
+
+
+async def _stream_library():
+    """Encode library items incrementally, one batch of sessions at a time"""
+    yield b'{"videos":['
+    first = True
+    async for batch in session_store.scan_ids(session_store.COMPLETED_SESSIONS_KEY):
+        for sid, data in zip(batch, await session_store.load_many(batch)):
+            for entry in _library_entries(sid, data):
+                item = orjson.dumps(_library_item(*entry))
+                yield item if first else b"," + item
+                first = False
+    yield b"]}"
 
-    return VideoLibraryResponse(
-        videos=all_videos[offset:offset + limit],
-        total=len(all_videos)
-    )
+
+def _library_entries(sid: str, data: Optional[dict]) -> list:
+    """Library entry tuples for all clips of a completed session (empty on bad data)"""
+    try:
+        if data is None or data.get("status") != "completed":
+            return []
+
+        variants = data.get("variants", [])
+        if isinstance(variants, str):
+            variants = json.loads(variants)
+        created_at = _parse_timestamp(data.get("created_at"))
+
+        return [
+            (created_at, sid, variant["variant_index"], clip["clip_index"], clip, data)
+            for variant in variants
+            for clip in variant.get("clips", [])
+            if clip.get("video_url")
+        ]
+    except Exception:
+        return []
+
+
+def _library_item(
+    created_at: datetime,
+    sid: str,
+    variant_index: int,
+    clip_index: int,
+    clip: dict,
+    data: dict
+) -> dict:
+    """Plain dict in VideoLibraryItem shape (stored data is trusted)"""
+    # Transform Google Drive URLs to proxy URLs
+    video_url = clip["video_url"]
+    if video_url.startswith("https://drive.google.com"):
+        filename = f"variant_{str(clip_index).zfill(3)}.mp4"
+        video_url = f"/api/v1/videos/{sid}/{filename}"
+
+    return {
+        "session_id": sid,
+        "variant_index": variant_index,
+        "clip_index": clip_index,
+        "video_url": video_url,
+        "product_name": data.get("product_name", ""),
+        "created_at": created_at,
+        "duration": float(clip.get("duration", 0.0)),
+        "provider": data.get("provider", "kie.ai"),
+        "model": data.get("model", "veo-3.1-fast"),
+    }
 
 
 # === Cost Estimation ===
@@ -339,8 +448,12 @@ async def estimate_cost(
     estimated_scenes: int = 4
 ):
     """Estimate cost for video generation"""
-    cost_key = (provider, model)
-    cost_per_8s = COST_PER_8S.get(cost_key, 0.50)
+    cost_per_8s = COST_PER_8S.get(f"{provider.value}:{model.value}")
+    if cost_per_8s is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model {model.value} is not available for provider {provider.value}"
+        )
 
     # Assume average 8s per scene
     total_cost = cost_per_8s * estimated_scenes * num_variants
@@ -374,9 +487,6 @@ async def get_api_status():
 @router.get("/videos/{session_id}/{filename}")
 async def stream_video(session_id: str, filename: str, download: bool = False):
     """Stream video file - supports local storage and Google Drive proxy"""
-    from fastapi.responses import FileResponse, StreamingResponse, Response
-    from pathlib import Path
-
     # Headers for download mode
     headers = {}
     if download:
@@ -532,19 +642,50 @@ DEFAULT_VEO_3_PROMPT = """You are an expert video producer creating prompts for
 """
 
 
-@router.get("/settings", response_model=SettingsResponse)
-async def get_settings():
-    """Get all app settings"""
-    data = redis_client.hgetall("app_settings")
-    data = {k.decode(): v.decode() for k, v in data.items()} if data else {}
+# Bumped on every settings write so readers can reuse their cached response
+SETTINGS_VERSION_KEY = "app_settings:ver"
 
-    return SettingsResponse(
+
+def _encode_settings(data: dict) -> bytes:
+    """Serialize the settings response for the given stored settings once"""
+    response = SettingsResponse(
         gemini_key_set=bool(data.get("gemini_key")),
         kie_ai_key_set=bool(data.get("kie_ai_key")),
         defapi_key_set=bool(data.get("defapi_key")),
         sora_2_prompt=data.get("sora_2_prompt", DEFAULT_SORA_2_PROMPT),
         veo_3_prompt=data.get("veo_3_prompt", DEFAULT_VEO_3_PROMPT),
     )
+    return orjson.dumps(response.model_dump(mode="json"))
+
+
+# Encoded response when nothing has been configured (default prompts, no keys)
+_DEFAULT_SETTINGS_BYTES = _encode_settings({})
+
+# (version, encoded response) of the last settings read
+_settings_cache: Optional[Tuple[int, bytes]] = None
+
+
+async def save_app_settings(mapping: dict):
+    """Write settings fields and invalidate cached settings responses"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset("app_settings", mapping=mapping)
+        pipe.incr(SETTINGS_VERSION_KEY)
+        await pipe.execute()
+
+
+@router.get("/settings", response_model=SettingsResponse)
+async def get_settings():
+    """Get all app settings"""
+    global _settings_cache
+
+    version = int(await redis_client.get(SETTINGS_VERSION_KEY) or 0)
+    if _settings_cache is None or _settings_cache[0] != version:
+        data = await redis_client.hgetall("app_settings")
+        content = _encode_settings(data) if data else _DEFAULT_SETTINGS_BYTES
+        _settings_cache = (version, content)
+
+    # Pre-serialized JSON, skips model construction and encoding
+    return Response(content=_settings_cache[1], media_type="application/json")
 
 
 @router.post("/settings/keys")
@@ -559,16 +700,37 @@ async def save_api_keys(request: APIKeysRequest):
         updates["defapi_key"] = request.defapi_key
 
     if updates:
-        redis_client.hset("app_settings", mapping=updates)
+        await save_app_settings(updates)
 
     return {"message": "API keys saved", "keys_updated": list(updates.keys())}
 
 
+# Single-model probe instead of listing the whole model catalog
+GEMINI_PROBE_MODEL = "models/gemini-2.0-flash"
+GEMINI_KEY_CACHE_TTL = 60  # seconds
+
+# sha256(key) -> expiry (monotonic) of recently validated Gemini keys
+_validated_gemini_keys: Dict[str, float] = {}
+
+
+def _probe_gemini_key(key_value: str):
+    """Raise if the Gemini key cannot fetch a single model"""
+    genai = get_genai()
+    genai.configure(api_key=key_value)
+    genai.get_model(GEMINI_PROBE_MODEL)
+
+
+def _remember_gemini_key(key_hash: str):
+    """Cache a successful validation and drop expired entries"""
+    now = time.monotonic()
+    for expired in [h for h, expires in _validated_gemini_keys.items() if expires < now]:
+        del _validated_gemini_keys[expired]
+    _validated_gemini_keys[key_hash] = now + GEMINI_KEY_CACHE_TTL
+
+
 @router.post("/settings/validate-key", response_model=ValidateKeyResponse)
 async def validate_api_key(request: ValidateKeyRequest):
     """Validate a single API key"""
-    import httpx
-
     key_type = request.key_type
     key_value = request.key_value
 
@@ -581,10 +743,11 @@ async def validate_api_key(request: ValidateKeyRequest):
 
     try:
         if key_type == KeyType.GEMINI:
-            # Test Gemini API
-            import google.generativeai as genai
-            genai.configure(api_key=key_value)
-            list(genai.list_models())
+            # Test Gemini API (skipped if the same key was validated recently)
+            key_hash = hashlib.sha256(key_value.encode()).hexdigest()
+            if _validated_gemini_keys.get(key_hash, 0.0) < time.monotonic():
+                await run_in_threadpool(_probe_gemini_key, key_value)
+                _remember_gemini_key(key_hash)
             return ValidateKeyResponse(
                 key_type=key_type,
                 is_valid=True,
@@ -647,7 +810,7 @@ async def save_prompt_templates(request: PromptTemplatesRequest):
         updates["veo_3_prompt"] = request.veo_3_prompt
 
     if updates:
-        redis_client.hset("app_settings", mapping=updates)
+        await save_app_settings(updates)
 
     return {"message": "Prompts saved", "prompts_updated": list(updates.keys())}
 
@@ -655,7 +818,7 @@ async def save_prompt_templates(request: PromptTemplatesRequest):
 @router.post("/settings/prompts/reset")
 async def reset_prompt_templates():
     """Reset prompt templates to defaults"""
-    redis_client.hset("app_settings", mapping={
+    await save_app_settings({
         "sora_2_prompt": DEFAULT_SORA_2_PROMPT,
         "veo_3_prompt": DEFAULT_VEO_3_PROMPT,
     })
@@ -667,11 +830,11 @@ async def reset_prompt_templates():
 @router.get("/sessions/{session_id}/logs")
 async def get_session_logs(session_id: str, limit: int = 100):
     """Get pipeline logs for a session"""
-    if not redis_client.exists(f"session:{session_id}"):
+    if not await session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Session not found")
 
     logger = PipelineLogger(session_id)
-    logs = logger.get_logs(limit=limit)
+    logs = await run_in_threadpool(logger.get_logs, limit=limit)
 
     return {
         "session_id": session_id,
@@ -683,11 +846,11 @@ async def get_session_logs(session_id: str, limit: int = 100):
 @router.get("/sessions/{session_id}/logs/errors")
 async def get_session_errors(session_id: str):
     """Get only error logs for a session"""
-    if not redis_client.exists(f"session:{session_id}"):
+    if not await session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Session not found")
 
     logger = PipelineLogger(session_id)
-    errors = logger.get_errors()
+    errors = await run_in_threadpool(logger.get_errors)
 
     return {
         "session_id": session_id,
@@ -699,10 +862,10 @@ async def get_session_errors(session_id: str):
 @router.get("/sessions/{session_id}/logs/summary")
 async def get_session_log_summary(session_id: str):
     """Get summary of session logs"""
-    if not redis_client.exists(f"session:{session_id}"):
+    if not await session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Session not found")
 
     logger = PipelineLogger(session_id)
-    summary = logger.get_summary()
+    summary = await run_in_threadpool(logger.get_summary)
 
     return summary
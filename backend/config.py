@@ -17,6 +17,7 @@ class Settings(BaseSettings):
 
     # Infrastructure
     redis_url: str = "redis://localhost:6379/0"
+    redis_max_connections: int = 32  # Per API process
     celery_broker_url: str = "redis://localhost:6379/0"
 
     # Storage Strategy
@@ -24,6 +25,13 @@ class Settings(BaseSettings):
     storage_path: str = "/app/storage"
     temp_path: str = "/app/tmp"
 
+    # Product images
+    jpeg_quality: int = 85  # Re-encode quality for uploaded product images
+
+    # Logging
+    log_level: str = "DEBUG"  # Minimum pipeline log level: DEBUG, INFO, SUCCESS, WARNING, ERROR, CRITICAL
+    log_console_verbose: bool = False  # Print full log data on the console instead of its keys
+
     # Defaults
     default_provider: str = "kie.ai"
     default_model: str = "veo-3.1-fast"
@@ -1,12 +1,25 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+
+from api.routes import router, get_genai
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-warm heavy SDK imports so the first request does not pay for them
+    get_genai()
+    yield
 
-from api.routes import router
 
 app = FastAPI(
     title="Video2Video API",
     description="AI-Powered TikTok Product Video Clone Platform",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -6,11 +6,28 @@ Berechnet wie ein Video in Clips aufgeteilt werden soll, um:
 2. Kosten zu optimieren (keine unnötigen Clips)
 3. Natürliche Szenen-Grenzen zu respektieren (wenn möglich)
 """
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import List, Literal, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Final, List, Literal, Mapping, Optional, Tuple
 
 
-@dataclass
+# Pacing-Varianten eines Clips
+Pacing = Literal["normal", "slightly_faster", "slightly_slower"]
+
+
+# Geteilter leerer Pacing-Hinweis für alle Clips außer dem ersten
+_NO_NOTE: Final[str] = ""
+
+# (zusätzliche Clips, Pacing) je Fall: passt genau / kleine / große Überschreitung
+_PACING_TABLE: Final[Tuple[Tuple[int, Pacing], ...]] = ((0, "normal"), (0, "slightly_faster"), (1, "normal"))
+
+# Fallback-Limits für unbekannte Models
+_DEFAULT_LIMITS = MappingProxyType({"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0})
+
+
+@dataclass(slots=True, frozen=True)
 class ClipSegment:
     """Ein Clip-Segment mit Timing und Pacing-Info"""
     clip_index: int
@@ -18,33 +35,38 @@ class ClipSegment:
     end_time: float
     duration: float
     target_duration: float  # Ziel-Dauer für AI-Generation
-    pacing: Literal["normal", "slightly_faster", "slightly_slower"]
+    pacing: Pacing
     pacing_note: str  # Hinweis für Gemini-Prompt
 
 
 class ClipSegmenter:
     """Berechnet optimale Clip-Segmentierung basierend auf Model-Limits"""
 
-    # Model-spezifische Limits
+    # Model-spezifische Limits (read-only, werden geteilt)
     MODEL_LIMITS = {
         # defapi.org models
-        "defapi-sora-2": {"max_duration": 15.0, "min_duration": 5.0, "default_duration": 10.0},
-        "defapi-veo-3.1": {"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0},
+        "defapi-sora-2": MappingProxyType({"max_duration": 15.0, "min_duration": 5.0, "default_duration": 10.0}),
+        "defapi-veo-3.1": MappingProxyType({"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0}),
         # kie.ai models
-        "veo-3.1-fast": {"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0},
-        "veo-3.1-quality": {"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0},
-        "sora-2": {"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0},
+        "veo-3.1-fast": MappingProxyType({"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0}),
+        "veo-3.1-quality": MappingProxyType({"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0}),
+        "sora-2": MappingProxyType({"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0}),
     }
 
     # Puffer am Anfang/Ende für AI-Übergang (Person braucht Zeit zu starten)
-    BUFFER_SECONDS = 0.5
+    BUFFER_SECONDS: Final[float] = 0.5
 
     # Max Sekunden die durch schnelleres Pacing kompensiert werden können
-    PACING_THRESHOLD = 3.0
+    PACING_THRESHOLD: Final[float] = 3.0
+
+    # Max Größe der DP-Tabelle (Szenen-Intervalle × Clips), darüber greedy
+    DP_MAX_CELLS = 250_000
 
-    def get_model_limits(self, model: str) -> dict:
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_model_limits(model: str) -> Mapping[str, float]:
         """Hole Model-Limits, fallback zu 8s wenn unbekannt"""
-        return self.MODEL_LIMITS.get(model, {"max_duration": 8.0, "min_duration": 3.0, "default_duration": 8.0})
+        return ClipSegmenter.MODEL_LIMITS.get(model, _DEFAULT_LIMITS)
 
     def calculate_segments(
         self,
@@ -63,7 +85,7 @@ class ClipSegmenter:
         Returns:
             Liste von ClipSegment mit Timing und Pacing-Info
         """
-        limits = self.get_model_limits(model)
+        limits = ClipSegmenter.get_model_limits(model)
         max_dur = limits["max_duration"]
 
         # Berechne minimale Anzahl an Clips
@@ -71,26 +93,17 @@ class ClipSegmenter:
         remainder = video_duration - (min_clips * max_dur)
 
         # Entscheide: N Clips mit schnellerem Pacing oder N+1 Clips?
-        if remainder <= 0:
-            # Video passt genau in N Clips
-            num_clips = min_clips
-            pacing = "normal"
-            pacing_note = ""
-        elif remainder <= self.PACING_THRESHOLD:
+        # 0 = passt genau, 1 = kleine Überschreitung, 2 = große Überschreitung
+        case = (remainder > 0) + (remainder > self.PACING_THRESHOLD)
+        extra_clips, pacing = _PACING_TABLE[case]
+        num_clips = min_clips + extra_clips
+
+        pacing_note = _NO_NOTE
+        if case == 1:
             # Kleine Überschreitung → kompensiere durch schnelleres Pacing
-            num_clips = min_clips
-            pacing = "slightly_faster"
             compression_ratio = video_duration / (num_clips * max_dur)
-            pacing_note = f"PACING: Speak {int((compression_ratio - 1) * 100)}% faster to fit {video_duration:.1f}s content into {num_clips * max_dur:.1f}s. Keep natural rhythm but slightly quicker pace."
-        else:
-            # Große Überschreitung → brauchen einen zusätzlichen Clip
-            num_clips = min_clips + 1
-            pacing = "normal"
-            pacing_note = ""
-
-        # Berechne Clip-Längen
-        # Versuche gleichmäßige Aufteilung
-        clip_duration = video_duration / num_clips
+            faster_pct = int((compression_ratio - 1) * 100)
+            pacing_note = f"PACING: Speak {faster_pct:d}% faster to fit {video_duration:.1f}s content into {num_clips * max_dur:.1f}s. Keep natural rhythm but slightly quicker pace."
 
         # Wenn wir Szenen-Grenzen haben, versuche Clips an Szenen auszurichten
         if scene_boundaries and len(scene_boundaries) > 0:
@@ -110,12 +123,12 @@ class ClipSegmenter:
         video_duration: float,
         num_clips: int,
         max_dur: float,
-        pacing: str,
+        pacing: Pacing,
         pacing_note: str
     ) -> List[ClipSegment]:
         """Erstelle gleichmäßig verteilte Clips"""
         clip_duration = video_duration / num_clips
-        segments = []
+        segments: List[ClipSegment] = []
 
         for i in range(num_clips):
             start = i * clip_duration
@@ -128,7 +141,7 @@ class ClipSegmenter:
                 duration=end - start,
                 target_duration=min(clip_duration, max_dur),
                 pacing=pacing,
-                pacing_note=pacing_note if i == 0 else ""  # Pacing-Note nur beim ersten Clip
+                pacing_note=pacing_note if i == 0 else _NO_NOTE  # Pacing-Note nur beim ersten Clip
             ))
 
         return segments
@@ -139,24 +152,122 @@ class ClipSegmenter:
         num_clips: int,
         max_dur: float,
         scene_boundaries: List[float],
-        pacing: str,
+        pacing: Pacing,
         pacing_note: str
     ) -> List[ClipSegment]:
         """
-        Versuche Clips an Szenen-Grenzen auszurichten.
+        Richte Clips optimal an Szenen-Grenzen aus (DP-Partitionierung).
         Falls nicht möglich, fallback zu gleichmäßiger Aufteilung.
         """
-        # Füge Start und Ende hinzu
-        boundaries = [0.0] + sorted(scene_boundaries) + [video_duration]
+        # Füge Start und Ende hinzu (nur Grenzen innerhalb des Videos, ohne Duplikate)
+        inner = sorted({float(t) for t in scene_boundaries if 0.0 < t < video_duration})
+        boundaries = [0.0] + inner + [video_duration]
+        num_scenes = len(boundaries) - 1
 
         # Wenn weniger Szenen als Clips, nutze gleichmäßige Aufteilung
-        if len(boundaries) - 1 < num_clips:
+        if num_scenes < num_clips:
             return self._uniform_segments(video_duration, num_clips, max_dur, pacing, pacing_note)
 
-        # Versuche optimale Grenzen zu finden
+        # Sehr große Probleme: greedy statt DP
+        if num_scenes * num_clips > self.DP_MAX_CELLS:
+            return self._align_to_scenes_greedy(
+                boundaries, video_duration, num_clips, max_dur, pacing, pacing_note
+            )
+
+        target_clip_duration = video_duration / num_clips
+        # Bei schnellerem Pacing ist die Ziel-Dauer selbst größer als max_dur
+        limit = max(max_dur, target_clip_duration)
+
+        cuts = self._partition_scenes(boundaries, num_clips, target_clip_duration, limit)
+        if cuts is None:
+            # Einzelne Szenen zu lang für das Limit
+            return self._uniform_segments(video_duration, num_clips, max_dur, pacing, pacing_note)
+
+        segments: List[ClipSegment] = []
+        for k in range(num_clips):
+            start = boundaries[cuts[k]]
+            end = boundaries[cuts[k + 1]]
+            segments.append(ClipSegment(
+                clip_index=k,
+                start_time=start,
+                end_time=end,
+                duration=end - start,
+                target_duration=min(end - start, max_dur),
+                pacing=pacing,
+                pacing_note=pacing_note if k == 0 else _NO_NOTE
+            ))
+
+        return segments
+
+    @staticmethod
+    def _partition_scenes(
+        boundaries: List[float],
+        num_clips: int,
+        target: float,
+        limit: float
+    ) -> Optional[List[int]]:
+        """
+        Optimale lineare Partitionierung der Szenen-Intervalle in num_clips Clips.
+
+        Minimiert die Summe der quadratischen Abweichungen von target, kein Clip
+        länger als limit. dp[k][j] = min über i<j von dp[k-1][i] + (b[j] - b[i] - target)².
+
+        Returns:
+            Indizes der Schnitt-Grenzen in boundaries (num_clips + 1 Stück),
+            None wenn keine gültige Aufteilung existiert
+        """
+        n = len(boundaries) - 1
+        inf: float = float("inf")
+        limit += 1e-9  # Float-Toleranz
+
+        dp: List[List[float]] = [[inf] * (n + 1) for _ in range(num_clips + 1)]
+        parent: List[List[int]] = [[0] * (n + 1) for _ in range(num_clips + 1)]
+        dp[0][0] = 0.0
+
+        for k in range(1, num_clips + 1):
+            prev, row, par = dp[k - 1], dp[k], parent[k]
+            # k Clips brauchen mind. k Intervalle, die restlichen Clips mind. je eins
+            for j in range(k, n - (num_clips - k) + 1):
+                end = boundaries[j]
+                best, best_i = inf, 0
+                # Nur Starts i mit b[j] - b[i] <= limit kommen in Frage (boundaries sortiert)
+                first_i = max(k - 1, bisect_left(boundaries, end - limit, 0, j))
+                for i in range(first_i, j):
+                    if prev[i] == inf:
+                        continue
+                    length = end - boundaries[i]
+                    cost = prev[i] + (length - target) ** 2
+                    if cost < best:
+                        best, best_i = cost, i
+                row[j] = best
+                par[j] = best_i
+
+        if dp[num_clips][n] == inf:
+            return None
+
+        # Schnitte über Parent-Pointer rekonstruieren
+        cuts = [n]
+        for k in range(num_clips, 0, -1):
+            cuts.append(parent[k][cuts[-1]])
+        cuts.reverse()
+        return cuts
+
+    def _align_to_scenes_greedy(
+        self,
+        boundaries: List[float],
+        video_duration: float,
+        num_clips: int,
+        max_dur: float,
+        pacing: Pacing,
+        pacing_note: str
+    ) -> List[ClipSegment]:
+        """
+        Greedy-Ausrichtung an Szenen-Grenzen (nur für sehr viele Szenen × Clips).
+        boundaries enthält bereits Start (0.0) und Ende (video_duration).
+        """
         # Einfache Strategie: Teile Szenen möglichst gleichmäßig auf Clips auf
         target_clip_duration = video_duration / num_clips
-        segments = []
+        segments: List[ClipSegment] = []
         current_start = 0.0
         clips_created = 0
 
@@ -175,7 +286,7 @@ class ClipSegmenter:
                     duration=end - current_start,
                     target_duration=min(end - current_start, max_dur),
                     pacing=pacing,
-                    pacing_note=pacing_note if clips_created == 0 else ""
+                    pacing_note=pacing_note if clips_created == 0 else _NO_NOTE
                 ))
 
                 current_start = end
@@ -184,31 +295,24 @@ class ClipSegmenter:
                 if clips_created >= num_clips:
                     break
 
-        # Falls wir nicht genug Clips erstellt haben, fülle auf
-        while len(segments) < num_clips:
-            # Teile den letzten Clip
-            last = segments[-1]
-            mid = (last.start_time + last.end_time) / 2
-
-            segments[-1] = ClipSegment(
-                clip_index=last.clip_index,
-                start_time=last.start_time,
-                end_time=mid,
-                duration=mid - last.start_time,
-                target_duration=min(mid - last.start_time, max_dur),
-                pacing=pacing,
-                pacing_note=last.pacing_note
-            )
-
-            segments.append(ClipSegment(
-                clip_index=len(segments),
-                start_time=mid,
-                end_time=last.end_time,
-                duration=last.end_time - mid,
-                target_duration=min(last.end_time - mid, max_dur),
-                pacing=pacing,
-                pacing_note=""
-            ))
+        # Falls wir nicht genug Clips erstellt haben: letzten Clip gleichmäßig aufteilen
+        missing = num_clips - len(segments)
+        if missing > 0:
+            last = segments.pop()
+            parts = missing + 1
+            step = (last.end_time - last.start_time) / parts
+            for p in range(parts):
+                start = last.start_time + p * step
+                end = last.end_time if p == parts - 1 else start + step
+                segments.append(ClipSegment(
+                    clip_index=len(segments),
+                    start_time=start,
+                    end_time=end,
+                    duration=end - start,
+                    target_duration=min(end - start, max_dur),
+                    pacing=pacing,
+                    pacing_note=last.pacing_note if p == 0 else _NO_NOTE
+                ))
 
         return segments
 
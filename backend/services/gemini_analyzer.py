@@ -10,13 +10,23 @@ Based on official documentation:
 - Veo 3.1: https://cloud.google.com/blog/products/ai-machine-learning/ultimate-prompting-guide-for-veo-3-1
 - Gemini: https://ai.google.dev/gemini-api/docs/video-understanding
 """
-import json
+import asyncio
+import functools
+import hashlib
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.resources import files
 from pathlib import Path
-from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
+from typing import Callable, Dict, List, Optional, Literal, Tuple
+from dataclasses import dataclass
+from pydantic import BaseModel, Field, ValidationError
 from enum import Enum
 
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import orjson
 import redis
 
 from config import settings
@@ -24,15 +34,34 @@ from services.scene_detector import Scene
 from services.transcript_extractor import transcript_extractor, TranscriptResult
 
 
+# Shared connection pool for settings lookups and caches. Blocking, so a burst waits for
+# a free connection instead of failing with "Too many connections"
+_REDIS_POOL = redis.BlockingConnectionPool.from_url(settings.redis_url, max_connections=16, timeout=5)
+
+# (key, expiry) of the last key read from Redis
+_KEY_CACHE_TTL = 30.0  # seconds
+_key_cache: Tuple[Optional[str], float] = (None, 0.0)
+
+
 def get_gemini_api_key() -> str:
     """Get Gemini API key from Redis settings or fall back to .env"""
+    global _key_cache
+
+    now = time.monotonic()
+    cached_key, expires = _key_cache
+    if cached_key and now < expires:
+        return cached_key
+
     try:
-        r = redis.from_url(settings.redis_url)
+        r = redis.Redis(connection_pool=_REDIS_POOL)
         key = r.hget("app_settings", "gemini_key")
-        if key:
-            return key.decode("utf-8") if isinstance(key, bytes) else key
-    except Exception:
-        pass
+    except redis.RedisError:
+        # Redis unreachable: keep using the last key set in the UI, if any
+        return cached_key or settings.google_gemini_api_key
+    if key:
+        key = key.decode("utf-8") if isinstance(key, bytes) else key
+        _key_cache = (key, now + _KEY_CACHE_TTL)
+        return key
     return settings.google_gemini_api_key
 
 
@@ -115,203 +144,388 @@ class VideoPromptResult(BaseModel):
     full_video_prompt: Optional[str] = Field(description="Single prompt for entire video if using seamless strategy")
 
 
+# JSON schema for structured output, built once
+VIDEO_PROMPT_JSON_SCHEMA = VideoPromptResult.model_json_schema()
+
+
+@dataclass
+class VideoJob:
+    """One scene-based analysis in a batch (see GeminiAnalyzer.analyze_videos_batch)"""
+    video_path: str
+    product_name: str
+    scenes: List[Scene]
+    target_model: TargetModel = TargetModel.VEO_3
+    transcript: Optional[TranscriptResult] = None
+    use_cache: bool = True  # False forces a fresh analysis for this job
+
+
 # ============================================================================
 # Prompt Templates for Target Models
 # ============================================================================
 
-SORA_2_SYSTEM_PROMPT = """You are an expert cinematographer creating production briefs for Sora 2 video generation.
-
-## PRIMARY GOAL: EXACT VISUAL CLONING
-Your task is to create prompts that will generate a video that looks VISUALLY IDENTICAL to the original.
-The AI video generator CANNOT see the original video - it only receives your text description.
-Therefore, you MUST describe EVERY visual detail with extreme precision.
-
-## MANDATORY VISUAL DETAILS TO EXTRACT AND INCLUDE:
-
-### 1. PERSON DESCRIPTION (CRITICAL - if person appears):
-- Gender: male/female
-- Approximate age: young adult, middle-aged, etc.
-- Ethnicity/appearance: skin tone, facial features
-- Facial hair: beard style, mustache, clean-shaven
-- Hair: color, length, style
-- Clothing: EXACT colors, patterns, logos, patches, accessories
-- Example: "A young Middle Eastern man with a dark full beard, short black hair, wearing a dark grey t-shirt with a small Germany flag patch on the chest"
-
-### 2. CAMERA & FRAMING:
-- Shot type: selfie-style, tripod medium shot, close-up, etc.
-- Person's position in frame: centered, slightly off-center
-- Distance from camera: close, medium, far
-- Camera angle: eye-level, slightly below, above
-
-### 3. BACKGROUND & ENVIRONMENT:
-- Room type: bedroom, office, studio, kitchen, living room
-- Wall color and texture
-- Visible furniture or objects
-- Doors, windows, decorations
-- Example: "minimal modern room with off-white walls, visible black door handle on left, simple ceiling lamp"
-
-### 4. LIGHTING:
-- Light direction: from left, right, front, behind
-- Light quality: soft natural daylight, harsh overhead, warm lamp
-- Shadows: where they fall
-
-### 5. ON-SCREEN TEXT/GRAPHICS (if present):
-- Exact text content
-- Position: top, bottom, center
-- Style: font color, background
-
-### 6. ACTIONS & BODY LANGUAGE:
-- Exact gestures: hand movements, pointing, holding
-- Facial expression: talking, smiling, serious
-- Body position: standing, sitting, leaning
-
-## SORA 2 PROMPTING RULES (from OpenAI's official guide):
-
-### Structure for each scene prompt:
-```
-[Detailed person description with clothing] stands/sits in [exact background description].
-[Camera shot type and angle], [lighting description].
-[Person] [exact action/gesture] while [speaking/looking at camera].
-The scene shows [product name] [how product appears if visible].
+# Shared prompt modules (services/prompts/*.md). Both system prompts start with the same
+# modules so the common leading tokens are identical across Sora and Veo requests (prompt caching).
+_PROMPTS_DIR = files("services") / "prompts"
 
-Cinematography:
-Camera shot: [framing and angle]
-Camera movement: [dolly, tracking, pan, static, handheld]
-Lens: [focal length and characteristics]
-Mood: [overall tone]
 
-Actions:
-- [Action 1: specific beat/gesture with timing]
-- [Action 2: distinct movement]
+@functools.cache
+def _load_prompt(name: str) -> str:
+    """Read a prompt module shipped with the package (once per process)"""
+    return (_PROMPTS_DIR / name).read_text(encoding="utf-8")
 
-[Dialogue if applicable - EXACT words from transcript]
-```
 
-### CRITICAL SORA 2 BEST PRACTICES:
+# Target-specific rules module per target model
+_RULES_MODULES = {
+    TargetModel.SORA_2: "sora2_rules.md",
+    TargetModel.VEO_3: "veo3_rules.md",
+}
 
-1. **Specificity over vagueness:**
-   - WEAK: "beautiful product shot"
-   - STRONG: "the serum bottle catches soft window light, amber liquid glowing warm against the white marble surface"
 
-2. **Camera language Sora understands:**
-   - Shot types: wide establishing, medium, medium close-up, close-up, extreme close-up, over-shoulder
-   - Movements: slow dolly-in, handheld ENG, tracking with subject, slow pan left/right, tilt up/down
-   - Lenses: 35mm, 50mm, 85mm (specify for aesthetic feel), anamorphic, shallow DOF
+@functools.cache
+def get_system_prompt(target_model: TargetModel) -> str:
+    """
+    Static system prompt of a target model, built on first use.
 
-3. **Lighting must be specific:**
-   - WEAK: "brightly lit"
-   - STRONG: "soft diffused window light from camera left, warm fill from practical lamp, cool rim separating subject from background"
+    Sent as system_instruction so every request starts with the same tokens and
+    hits Gemini's implicit prompt caching. Workers that only serve one target
+    model never load the other one.
+    """
+    return sys.intern(
+        _load_prompt("visual_extraction.md")
+        + _load_prompt(_RULES_MODULES[target_model])
+        + _load_prompt("product_name.md")
+    )
 
-4. **Actions in beats/counts:**
-   - "takes three steps toward camera, pauses, raises product to eye level"
-   - "hand enters frame from right, picks up bottle, rotates it slowly 90 degrees"
 
-5. **Film stock references work well:**
-   - "35mm Kodak warmth with subtle grain"
-   - "clean digital with anamorphic bokeh"
-   - "1970s documentary handheld aesthetic"
+@functools.cache
+def get_system_prompt_hash(target_model: TargetModel) -> str:
+    """Short fingerprint of a system prompt, part of the response cache key"""
+    return hashlib.blake2b(get_system_prompt(target_model).encode("utf-8"), digest_size=8).hexdigest()
 
-6. **Color anchors (3-5 colors):**
-   - "amber, cream, soft white, touches of gold"
 
-7. **One camera move + one subject action per shot** - don't overcomplicate
+# Legacy constant names, resolved lazily on first access (PEP 562)
+_LAZY_SYSTEM_PROMPTS = {
+    "SORA_2_SYSTEM_PROMPT": TargetModel.SORA_2,
+    "VEO_3_SYSTEM_PROMPT": TargetModel.VEO_3,
+}
 
-8. **Keep dialogue tight:** 6-12 words max for 8-second clips
 
-9. **CRITICAL - Product name in EVERY prompt:**
-   - The exact product name MUST appear 2-3 times in each scene prompt
-   - Example: "The [PRODUCT NAME] bottle catches soft window light... hand picks up [PRODUCT NAME]..."
-   - NEVER use generic terms like "the product" or "the item" - always use the exact product name
-"""
+def __getattr__(name: str) -> str:
+    if name in _LAZY_SYSTEM_PROMPTS:
+        return get_system_prompt(_LAZY_SYSTEM_PROMPTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-VEO_3_SYSTEM_PROMPT = """You are an expert video producer creating prompts for Google Veo 3.1 video generation.
 
-## PRIMARY GOAL: EXACT VISUAL CLONING
-Your task is to create prompts that will generate a video that looks VISUALLY IDENTICAL to the original.
-The AI video generator CANNOT see the original video - it only receives your text description.
-Therefore, you MUST describe EVERY visual detail with extreme precision.
+JSON_ONLY_SUFFIX = "\n\nRespond with valid JSON only."
 
-## MANDATORY VISUAL DETAILS TO EXTRACT AND INCLUDE:
 
-### 1. PERSON DESCRIPTION (CRITICAL - if person appears):
-- Gender: male/female
-- Approximate age: young adult, middle-aged, etc.
-- Ethnicity/appearance: skin tone, facial features
-- Facial hair: beard style, mustache, clean-shaven
-- Hair: color, length, style
-- Clothing: EXACT colors, patterns, logos, patches, accessories
+# ============================================================================
+# Analysis Prompt Templates (scene-based)
+# ============================================================================
 
-### 2. BACKGROUND & ENVIRONMENT:
-- Room type and wall colors
-- Visible objects (doors, furniture, decorations)
+EXACT_TRANSCRIPT_SECTION = """
+## EXACT TRANSCRIPT (USE THIS - DO NOT MAKE UP TEXT!)
+Language: {language}
+Full transcript: "{full_text}"
 
-### 3. CAMERA & LIGHTING:
-- Shot type and angle
-- Light direction and quality
+**CRITICAL: The dialogue/voiceover above is EXACT. Use these EXACT words in the prompts!**
+"""
 
-### 4. ON-SCREEN TEXT/GRAPHICS (if present):
-- Exact text content and position
+# Shared by both templates: product_name, total_duration, scene_info, transcript_section
+VIDEO_INFO_SECTION = """## VIDEO INFO
+- Product: {product_name}
+- Duration: {total_duration:.1f} seconds
+- Scenes detected:
+{scene_info}
+{transcript_section}
+"""
 
-## VEO 3.1 PROMPTING RULES (from Google's official guide):
+SORA_2_ANALYSIS_TEMPLATE = """## TASK: VISUAL CLONING
+Analyze this product video for "{product_name}" and generate SORA 2 OPTIMIZED prompts that will create a video VISUALLY IDENTICAL to the original.
 
-### 5-Part Formula for each scene:
-[Cinematography] + [Subject with EXACT appearance] + [Action] + [Context with EXACT background] + [Style & Ambiance]
+""" + VIDEO_INFO_SECTION + """## YOUR OUTPUT - MANDATORY DETAILS FOR EACH SCENE:
+Cover every MANDATORY VISUAL DETAIL from your instructions (person, camera & framing,
+background, lighting, on-screen text, actions) for each scene.
 
-### Example structure:
+## PROMPT FORMAT FOR EACH SCENE:
 ```
-[Camera shot and movement], [subject with EXACT gender, age, clothing description], [action being performed],
-[environment with wall colors and visible objects], [style, lighting, and mood].
-[Audio/dialogue if applicable]
+A [age] [gender] with [facial features], wearing [exact clothing description], [stands/sits] in [exact room description with wall color and visible objects].
+[Shot type] at [camera angle], [lighting description].
+[He/She] [exact action] while [speaking to camera / gesturing].
+[On-screen text if present: "exact text"]
+
+Cinematography:
+Camera shot: [specific framing]
+Camera movement: [static/movement type]
+Lens: [focal length]
+Mood: [tone]
+
+Actions:
+- [Specific gesture 1]
+- [Specific gesture 2]
+
+[EXACT dialogue from transcript if speaking]
 ```
 
-### CRITICAL VEO 3.1 BEST PRACTICES:
+## CRITICAL REMINDERS:
+- **PERSON DETAILS ARE MANDATORY**: Never say "a person" - always specify gender, appearance, clothing
+- **BACKGROUND DETAILS ARE MANDATORY**: Never say "a room" - describe wall color, visible objects
+- **Be SPECIFIC**: Every detail matters for visual matching
+- **DIALOGUE MUST BE EXACT**: Use the transcript word-for-word
 
-1. **Camera terminology Veo understands:**
-   - Movements: dolly shot, tracking shot, crane shot, aerial view, slow pan, POV shot
-   - Composition: wide shot, close-up, extreme close-up, low angle, high angle, two-shot
-   - Lens: shallow depth of field, wide-angle lens, soft focus, macro lens, deep focus
+## OUTPUT FORMAT
+Return a VideoPromptResult JSON with target_model="sora-2" and detailed prompts for each scene."""
 
-2. **Always specify lighting:**
-   - "soft morning light", "harsh fluorescent overhead", "dramatic spotlight"
-   - "warm golden hour lighting", "cool blue tones", "practical lamp glow"
+VEO_3_ANALYSIS_TEMPLATE = """## TASK
+Analyze this product video for "{product_name}" and generate VEO 3.1 OPTIMIZED prompts for each scene.
 
-3. **Dialogue format (important!):**
-   - Use: A woman says, "We have to leave now."
-   - NOT: "We have to leave now" (quotes alone don't work as well)
-   - Add "(no subtitles)" if you don't want text on screen
+""" + VIDEO_INFO_SECTION + """## YOUR OUTPUT
 
-4. **Sound effects format:**
-   - "SFX: the soft click of the bottle cap"
-   - "SFX: ambient room tone with distant traffic"
-   - "Ambient noise: the quiet hum of a studio"
+For EACH scene, generate a prompt using Veo 3.1's 5-part formula:
+[Cinematography] + [Subject] + [Action] + [Context] + [Style & Ambiance]
 
-5. **Style keywords that work:**
-   - "cinematic film look", "shot on 35mm film", "anamorphic widescreen"
-   - "product photography aesthetic", "commercial beauty style"
-   - Specific eras: "2020s digital clean", "1990s documentary style"
+1. **Analyze the scene:**
+   - Camera shot type and movement
+   - How {product_name} appears in frame
+   - What action/movement is shown
+   - Environment and setting
+   - Lighting and color mood
 
-6. **Color/mood specification:**
-   - "warm color palette with amber and cream tones"
-   - "clean, minimal aesthetic with soft whites"
-   - "moody, cinematic with cool shadows"
+2. **Generate VEO 3.1 prompt using this structure:**
+```
+[Shot type and camera movement], [subject showing {product_name}], [action being performed],
+[environment details], [style and lighting description].
+[Audio: A person says, "EXACT transcript text here." (no subtitles)]
+```
 
-7. **Timestamp prompting for sequences:**
-   [00:00-00:02] First action...
-   [00:02-00:04] Second action...
+## VEO 3.1 SPECIFIC FORMATTING:
+- Dialogue: A person says, "exact words here." (no subtitles) - USE EXACT TRANSCRIPT!
+- Sound effects: SFX: description of sound
+- Ambient: Ambient noise: background description
 
-8. **Keep it visual:** Describe what the camera SEES, not abstract concepts
+## TIMESTAMP PROMPT (for full_video_prompt):
+Also create a timestamp-based prompt combining all scenes:
+```
+[00:00-00:02] First scene description...
+[00:02-00:04] Second scene description...
+```
 
-9. **CRITICAL - Product name in EVERY prompt:**
-   - The exact product name MUST appear 2-3 times in each scene prompt
-   - Example: "[PRODUCT NAME] positioned center frame... hands demonstrating [PRODUCT NAME]..."
-   - NEVER use generic terms like "the product" or "the item" - always use the exact product name
+## CRITICAL REMINDERS FOR VEO 3.1:
+- Follow the VEO 3.1 best practices from your instructions (camera vocabulary, lighting, color/mood)
+- **DIALOGUE MUST BE EXACT**: Use the transcript text word-for-word, do NOT paraphrase!
+
+## OUTPUT FORMAT
+Return a VideoPromptResult JSON with target_model="veo-3.1" and optimized prompts for each scene.
+Include full_video_prompt with timestamp-based prompt for seamless generation."""
+
+
+# ============================================================================
+# Analysis Prompt Templates (clip-based)
+# ============================================================================
+
+FULL_TRANSCRIPT_SECTION = """
+## FULL TRANSCRIPT
+Language: {language}
+"{full_text}"
+
+**IMPORTANT: Distribute this transcript across the clips. Each clip should contain the portion of speech that occurs during that time range.**
 """
 
+# Fields: clip_count, product_name, clip_info, transcript_section, target_model, total_duration
+CLIP_ANALYSIS_TEMPLATE = """## TASK: GENERATE PROMPTS FOR {clip_count} CLIPS
+
+Analyze this product video for "{product_name}" and generate ONE PROMPT PER CLIP.
+
+## CLIP SEGMENTS (time-based, NOT scene-based):
+{clip_info}
+{transcript_section}
+## CRITICAL REQUIREMENTS:
+
+1. **ONE PROMPT PER CLIP** - You must generate exactly {clip_count} prompts, one for each clip segment above.
+
+2. **VISUAL CLONING** - Each prompt must describe the EXACT visual appearance:
+   - Person: gender, age, beard, hair, EXACT clothing with colors/logos
+   - Background: room type, wall colors, visible objects (doors, furniture)
+   - Camera: shot type, angle, position in frame
+   - Lighting: direction, quality (soft/harsh, natural/artificial)
+
+3. **TRANSCRIPT DISTRIBUTION** - Distribute the full transcript across clips:
+   - Clip 1: First portion of dialogue
+   - Clip 2: Next portion of dialogue
+   - etc.
+   - DO NOT repeat dialogue across clips!
+   - Each clip should have unique dialogue matching its time range
+
+4. **VISUAL CONSISTENCY** - All clips must have IDENTICAL:
+   - Person appearance (same clothing, same person)
+   - Background (same room, same objects)
+   - Lighting setup
+   - Camera style
+   Only the ACTION and DIALOGUE should differ between clips.
+
+## OUTPUT FORMAT
+
+Return JSON with this structure:
+{{
+  "product_name": "{product_name}",
+  "target_model": "{target_model}",
+  "total_duration": {total_duration:.1f},
+  "clip_prompts": [
+    {{
+      "clip_index": 0,
+      "start_time": ...,
+      "end_time": ...,
+      "duration": ...,
+      "target_duration": ...,
+      "prompt": "Full detailed prompt for clip 1...",
+      "transcript_text": "Exact dialogue for clip 1...",
+      "person_description": "...",
+      "background_description": "...",
+      "camera_description": "...",
+      "lighting_description": "...",
+      "action_description": "..."
+    }},
+    // ... one entry per clip
+  ],
+  "scene_prompts": [],
+  "visual_style": "...",
+  "color_palette": "...",
+  "film_reference": "..."
+}}"""
+
 
 # ============================================================================
 # Main Analyzer Class
 # ============================================================================
 
+# Polling of Gemini file processing (exponential backoff)
+POLL_INITIAL_DELAY = 0.25  # seconds
+POLL_MAX_DELAY = 4.0
+POLL_BACKOFF = 1.7
+PROCESSING_TIMEOUT = 600  # Give up on stuck uploads after 10 minutes
+
+# Start the fallback model if the primary has not answered after this many seconds
+# (video analysis on the primary model usually takes 10-30s, hedging too early doubles API cost)
+HEDGE_DELAY = 30.0
+
+# Transient API errors (rate limit, overload, timeout) worth a call to the fallback model
+FALLBACK_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+# Malformed model output (orjson decode and pydantic validation errors are ValueErrors),
+# retried once on the primary model at STRICT_TEMPERATURE with an explicit JSON instruction.
+# Other exceptions from response normalization are bugs and are raised, not retried.
+MALFORMED_OUTPUT_ERRORS = (ValueError,)
+STRICT_TEMPERATURE = 0.1
+
+# Videos analyzed at once by analyze_videos_batch. Each video can have a primary and a
+# hedged fallback call in flight, lower this if the Gemini project hits its rate limit.
+BATCH_MAX_CONCURRENCY = 8
+
+# Identical requests (same video bytes, prompt and system prompt) reuse the stored result,
+# unless the caller passes use_cache=False (session regeneration)
+RESPONSE_CACHE_PREFIX = "gemini_cache:"
+RESPONSE_CACHE_TTL = 24 * 3600  # seconds
+
+# Uploaded Gemini files by video content hash (Gemini deletes files after 48h)
+UPLOAD_CACHE_PREFIX = "gemini_file:"
+UPLOAD_CACHE_TTL = 47 * 3600  # seconds
+
+
+# Response normalization: (field, accepted names in priority order, default)
+_SCENE_TEXT_FIELDS = (
+    ("prompt", ("prompt", "video_prompt", "scene_prompt"), ""),
+    ("camera_shot", ("camera_shot", "shot_type"), "medium shot"),
+    ("camera_movement", ("camera_movement", "movement"), "static"),
+    ("subject_action", ("subject_action", "action"), "product display"),
+    ("lighting", ("lighting", "light"), "soft natural light"),
+    ("mood", ("mood", "atmosphere"), "professional"),
+)
+_CLIP_TEXT_FIELDS = (
+    "prompt", "transcript_text", "person_description", "background_description",
+    "camera_description", "lighting_description", "action_description",
+)
+# Style fields filled in when the model leaves them out
+_STYLE_DEFAULTS = {
+    "visual_style": "cinematic commercial style",
+    "color_palette": "warm, natural tones",
+    "film_reference": "modern digital commercial",
+}
+
+
+def _speech_lookup(transcript: Optional[TranscriptResult]) -> Optional[Callable[[float, float], str]]:
+    """Bound transcript.text_between, None when the video has no speech to look up"""
+    if transcript and transcript.has_speech and transcript.segments:
+        return transcript.text_between
+    return None
+
+
+def _first_present(data: dict, names: Tuple[str, ...], default):
+    """Value of the first of names present in data, default if none is"""
+    for name in names:
+        if name in data:
+            return data[name]
+    return default
+
+
+def _unwrap_class_name(result_dict: dict) -> dict:
+    """Result without a wrapping {"ClassName": {...}} level, if the model added one"""
+    if len(result_dict) == 1:
+        key, value = next(iter(result_dict.items()))
+        if isinstance(value, dict) and key[0].isupper():
+            return value
+    return result_dict
+
+
+# "MM:SS" for every whole second of the first hour, indexed by _format_time
+_MMSS = tuple(f"{mins:02d}:{secs:02d}" for mins in range(60) for secs in range(60))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_time_string(time_value: str) -> float:
+    """Parse MM:SS, HH:MM:SS or plain seconds from a string (0.0 if unparseable)"""
+    # Handle MM:SS or HH:MM:SS format
+    parts = time_value.split(":")
+    if len(parts) == 2:
+        return float(parts[0]) * 60 + float(parts[1])
+    elif len(parts) == 3:
+        return float(parts[0]) * 3600 + float(parts[1]) * 60 + float(parts[2])
+    # Try direct float conversion
+    try:
+        return float(time_value)
+    except ValueError:
+        return 0.0
+
+
+@functools.cache
+def _make_model(
+    name: str,
+    temperature: float,
+    system_instruction: Optional[str] = None,
+    structured: bool = False
+) -> genai.GenerativeModel:
+    """
+    Process-wide GenerativeModel per (name, temperature, system prompt), JSON output.
+
+    structured models also carry the VideoPromptResult response schema, so no
+    generation_config has to be passed (and validated by the SDK) per call.
+    """
+    generation_config = {
+        "temperature": temperature,
+        "response_mime_type": "application/json",
+    }
+    if structured:
+        generation_config["response_schema"] = VIDEO_PROMPT_JSON_SCHEMA
+    return genai.GenerativeModel(
+        name,
+        generation_config=generation_config,
+        system_instruction=system_instruction,
+    )
+
+
 class GeminiAnalyzer:
     """
     Analyzes videos and generates model-optimized prompts.
@@ -321,26 +535,33 @@ class GeminiAnalyzer:
     - Veo 3.1: Google's 5-part formula with timestamp support
     """
 
-    def __init__(self):
-        genai.configure(api_key=get_gemini_api_key())
-
-        # Primary model for video analysis
-        self.model = genai.GenerativeModel(
-            "gemini-2.5-pro-preview-06-05",
-            generation_config={
-                "temperature": 0.4,  # Slightly creative but consistent
-                "response_mime_type": "application/json",
-            }
-        )
+    # Primary model for video analysis and fallback model
+    PRIMARY_MODEL = "gemini-2.5-pro-preview-06-05"
+    FALLBACK_MODEL = "gemini-2.0-flash-exp"
+    TEMPERATURE = 0.4  # Slightly creative but consistent
 
-        # Fallback model
-        self.fallback_model = genai.GenerativeModel(
-            "gemini-2.0-flash-exp",
-            generation_config={
-                "temperature": 0.4,
-                "response_mime_type": "application/json",
-            }
-        )
+    def __init__(self):
+        # Configured lazily on first use, so importing this module needs no API key or network
+        self._api_key: Optional[str] = None
+
+    def _configure(self):
+        """Configure the Gemini SDK with the current API key (only when it changed)"""
+        api_key = get_gemini_api_key()
+        if api_key != self._api_key:
+            genai.configure(api_key=api_key)
+            # Used models keep the client (and key) of their first call, rebuild them
+            _make_model.cache_clear()
+            self._api_key = api_key
+
+    def _primary_model(self, target_model: TargetModel, structured: bool = False) -> genai.GenerativeModel:
+        """Primary model with the target model's system prompt (and response schema if structured)"""
+        self._configure()
+        return _make_model(self.PRIMARY_MODEL, self.TEMPERATURE, get_system_prompt(target_model), structured)
+
+    def _fallback_model(self, target_model: TargetModel) -> genai.GenerativeModel:
+        """Fallback model with the target model's system prompt"""
+        self._configure()
+        return _make_model(self.FALLBACK_MODEL, self.TEMPERATURE, get_system_prompt(target_model))
 
     def analyze_video(
         self,
@@ -348,7 +569,8 @@ class GeminiAnalyzer:
         product_name: str,
         scenes: List[Scene],
         target_model: TargetModel = TargetModel.VEO_3,
-        transcript: Optional[TranscriptResult] = None
+        transcript: Optional[TranscriptResult] = None,
+        use_cache: bool = True
     ) -> VideoPromptResult:
         """
         Analyze video and generate optimized prompts for the target model.
@@ -359,67 +581,464 @@ class GeminiAnalyzer:
             scenes: List of detected scenes with timestamps
             target_model: Which model to optimize prompts for (sora-2 or veo-3.1)
             transcript: Pre-extracted transcript with timestamps (optional but recommended)
+            use_cache: Reuse a stored result of an identical request (False forces a fresh analysis)
 
         Returns:
             VideoPromptResult with scene-by-scene optimized prompts
+
+        Runs analyze_video_async in its own event loop, so it must not be called
+        from async code (await analyze_video_async there instead). A losing hedged
+        call does not delay the return (see _generate_hedged).
+        """
+        return asyncio.run(
+            self.analyze_video_async(video_path, product_name, scenes, target_model, transcript, use_cache)
+        )
+
+    async def analyze_video_async(
+        self,
+        video_path: str,
+        product_name: str,
+        scenes: List[Scene],
+        target_model: TargetModel = TargetModel.VEO_3,
+        transcript: Optional[TranscriptResult] = None,
+        use_cache: bool = True
+    ) -> VideoPromptResult:
+        """
+        Async variant of analyze_video.
+
+        Blocking SDK calls run in worker threads and the processing poll uses
+        asyncio.sleep, so the event loop stays free while Gemini processes the upload.
+        Generation is hedged with the fallback model (see _generate_hedged).
+        """
+        results = await self._analyze_targets_async(
+            video_path, product_name, scenes, (target_model,), transcript, use_cache
+        )
+        return results[target_model]
+
+    def analyze_both(
+        self,
+        video_path: str,
+        product_name: str,
+        scenes: List[Scene],
+        transcript: Optional[TranscriptResult] = None,
+        use_cache: bool = True
+    ) -> Dict[TargetModel, VideoPromptResult]:
+        """
+        Analyze video for Sora 2 and Veo 3.1 at once.
+
+        Runs analyze_both_async in its own event loop, so it must not be called
+        from async code (await analyze_both_async there instead).
         """
+        return asyncio.run(self.analyze_both_async(video_path, product_name, scenes, transcript, use_cache))
+
+    async def analyze_both_async(
+        self,
+        video_path: str,
+        product_name: str,
+        scenes: List[Scene],
+        transcript: Optional[TranscriptResult] = None,
+        use_cache: bool = True
+    ) -> Dict[TargetModel, VideoPromptResult]:
+        """
+        Async variant of analyze_both.
+
+        The video is uploaded once and both target models are generated concurrently,
+        so wall time is the slower of the two instead of their sum.
+        """
+        return await self._analyze_targets_async(
+            video_path, product_name, scenes, tuple(TargetModel), transcript, use_cache
+        )
+
+    async def analyze_videos_batch(
+        self,
+        jobs: List[VideoJob],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY
+    ) -> List[VideoPromptResult]:
+        """
+        Analyze several videos concurrently, at most max_concurrency at a time.
+
+        Each job goes through analyze_video_async (upload reuse, response cache,
+        hedged generation; VideoJob.use_cache=False skips stored results). Results
+        are returned in job order; the first failing job raises.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(job: VideoJob) -> VideoPromptResult:
+            async with semaphore:
+                return await self.analyze_video_async(
+                    job.video_path, job.product_name, job.scenes, job.target_model, job.transcript,
+                    use_cache=job.use_cache
+                )
+
+        return list(await asyncio.gather(*(run(job) for job in jobs)))
+
+    async def _analyze_targets_async(
+        self,
+        video_path: str,
+        product_name: str,
+        scenes: List[Scene],
+        target_models: Tuple[TargetModel, ...],
+        transcript: Optional[TranscriptResult],
+        use_cache: bool = True
+    ) -> Dict[TargetModel, VideoPromptResult]:
+        """
+        Scene analysis for several target models sharing transcript, upload and cache lookups.
+
+        With use_cache=False stored results are ignored and overwritten by the fresh ones.
+        """
+        # Skip transcript, upload and generation for requests that were answered before
+        video_digest = await asyncio.to_thread(self._video_digest, video_path)
+        scene_bounds = [(s.index, s.start_time, s.end_time, s.duration) for s in scenes]
+        cache_keys = {
+            target: self._response_cache_key(
+                video_digest, target, "scenes", product_name, scene_bounds, transcript
+            )
+            for target in target_models
+        }
+        results = {}
+        if use_cache:
+            for target, cache_key in cache_keys.items():
+                cached = await asyncio.to_thread(self._load_cached_result, cache_key)
+                if cached is not None:
+                    results[target] = cached
+
+        missing = [target for target in target_models if target not in results]
+        if not missing:
+            return results
+
         # Extract transcript if not provided
         if transcript is None:
-            print("Extracting transcript from video...")
-            transcript = transcript_extractor.extract_transcript(video_path)
-            print(f"Transcript extracted: {len(transcript.segments)} segments, language: {transcript.language}")
+            transcript = await asyncio.to_thread(self._extract_transcript, video_path)
 
-        # Upload video to Gemini File API
-        video_file = genai.upload_file(video_path)
+        prompts = {
+            target: self._build_scene_request(product_name, scenes, target, transcript)
+            for target in missing
+        }
 
-        # Wait for processing
-        import time
+        # Upload video to Gemini File API once and wait for processing
+        video_file = await self._upload_video_async(video_path, video_digest)
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = {
+                    target: tg.create_task(self._generate_hedged(
+                        video_file, prompts[target], product_name, scenes, target
+                    ))
+                    for target in missing
+                }
+        except ExceptionGroup as eg:
+            # Surface the generation error itself, as for a single target model
+            raise eg.exceptions[0]
+
+        for target, task in tasks.items():
+            results[target] = task.result()
+            await asyncio.to_thread(self._store_result, cache_keys[target], results[target])
+        return results
+
+    def _extract_transcript(self, video_path: str) -> TranscriptResult:
+        """Extract transcript with timestamps from the video"""
+        print("Extracting transcript from video...")
+        transcript = transcript_extractor.extract_transcript(video_path)
+        print(f"Transcript extracted: {len(transcript.segments)} segments, language: {transcript.language}")
+        return transcript
+
+    def _upload_video(self, video_path: str, video_digest: Optional[str] = None):
+        """
+        Upload video to Gemini File API and poll with backoff until it is processed.
+
+        With a video_digest, a file uploaded earlier for the same content is reused.
+        """
+        self._configure()
+        video_file = self._cached_upload(video_digest) if video_digest else None
+        uploaded = video_file is None
+        if uploaded:
+            video_file = genai.upload_file(video_path)
+
+        video_file = self._wait_for_active(video_file)
+        if uploaded and video_digest:
+            self._remember_upload(video_digest, video_file)
+        return video_file
+
+    async def _upload_video_async(self, video_path: str, video_digest: Optional[str] = None):
+        """Async variant of _upload_video (SDK calls in threads, non-blocking sleep)"""
+        self._configure()
+        video_file = None
+        if video_digest:
+            video_file = await asyncio.to_thread(self._cached_upload, video_digest)
+        uploaded = video_file is None
+        if uploaded:
+            video_file = await asyncio.to_thread(genai.upload_file, video_path)
+
+        video_file = await self._wait_for_active_async(video_file)
+        if uploaded and video_digest:
+            await asyncio.to_thread(self._remember_upload, video_digest, video_file)
+        return video_file
+
+    @staticmethod
+    def _wait_for_active(video_file, timeout: float = PROCESSING_TIMEOUT):
+        """Poll a Gemini file with exponential backoff until it is no longer PROCESSING"""
+        delay = POLL_INITIAL_DELAY
+        deadline = time.monotonic() + timeout
         while video_file.state.name == "PROCESSING":
-            time.sleep(2)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Video processing timed out after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
             video_file = genai.get_file(video_file.name)
 
         if video_file.state.name == "FAILED":
             raise ValueError(f"Video processing failed: {video_file.state.name}")
+        return video_file
+
+    @staticmethod
+    async def _wait_for_active_async(video_file, timeout: float = PROCESSING_TIMEOUT):
+        """Async variant of _wait_for_active (SDK calls in threads, non-blocking sleep)"""
+        delay = POLL_INITIAL_DELAY
+        deadline = time.monotonic() + timeout
+        while video_file.state.name == "PROCESSING":
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Video processing timed out after {timeout}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+            video_file = await asyncio.to_thread(genai.get_file, video_file.name)
+
+        if video_file.state.name == "FAILED":
+            raise ValueError(f"Video processing failed: {video_file.state.name}")
+        return video_file
+
+    @staticmethod
+    def _video_digest(video_path: str) -> str:
+        """Content hash of a video file (read in chunks)"""
+        with open(video_path, "rb") as f:
+            return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+    @staticmethod
+    def _cached_upload(video_digest: str):
+        """Gemini file uploaded earlier for this content, None if unknown or expired"""
+        try:
+            name = redis.Redis(connection_pool=_REDIS_POOL).get(UPLOAD_CACHE_PREFIX + video_digest)
+        except redis.RedisError:
+            return None
+        if name is None:
+            return None
+        try:
+            video_file = genai.get_file(name.decode("utf-8"))
+        except Exception as e:
+            # Deleted on the Gemini side (expired) - upload again
+            print(f"Cached upload not available, uploading again: {e}")
+            return None
+        if video_file.state.name == "FAILED":
+            return None
+        print(f"Reusing uploaded video: {video_file.name}")
+        return video_file
+
+    @staticmethod
+    def _remember_upload(video_digest: str, video_file):
+        """Remember a freshly uploaded Gemini file for this content (best effort)"""
+        try:
+            redis.Redis(connection_pool=_REDIS_POOL).set(
+                UPLOAD_CACHE_PREFIX + video_digest, video_file.name, ex=UPLOAD_CACHE_TTL
+            )
+        except redis.RedisError:
+            pass
+
+    def _build_scene_request(
+        self,
+        product_name: str,
+        scenes: List[Scene],
+        target_model: TargetModel,
+        transcript: Optional[TranscriptResult]
+    ) -> str:
+        """Analysis prompt for scene-based analysis (the system prompt is sent separately)"""
+        # Scene list, duration and transcript are the same for both target models
+        scene_info = self._build_scene_info(scenes, transcript)
+        total_duration = scenes[-1].end_time if scenes else 0
+        transcript_section = self._build_transcript_section(transcript)
 
         # Build prompt based on target model (now with transcript)
         if target_model == TargetModel.SORA_2:
-            system_prompt = SORA_2_SYSTEM_PROMPT
-            prompt = self._build_sora_prompt(product_name, scenes, transcript)
-        else:
-            system_prompt = VEO_3_SYSTEM_PROMPT
-            prompt = self._build_veo_prompt(product_name, scenes, transcript)
+            return self._build_sora_prompt(
+                product_name, scene_info, total_duration, transcript_section
+            )
+        return self._build_veo_prompt(
+            product_name, scene_info, total_duration, transcript_section
+        )
 
-        # Get JSON schema
-        json_schema = VideoPromptResult.model_json_schema()
+    def _response_cache_key(
+        self,
+        video_digest: str,
+        target_model: TargetModel,
+        kind: str,
+        product_name: str,
+        segments: list,
+        transcript: Optional[TranscriptResult]
+    ) -> str:
+        """
+        Cache key over model, system prompt, video content and request inputs.
 
+        Only deterministic inputs go in, so the key is known before the transcript
+        is extracted; transcript=None stands for the one extracted from the video.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{self.PRIMARY_MODEL}:{get_system_prompt_hash(target_model)}:{video_digest}:{kind}:".encode())
+        digest.update(orjson.dumps({
+            "product_name": product_name,
+            "segments": segments,
+            "transcript": transcript.model_dump() if transcript is not None else None,
+        }, option=orjson.OPT_SORT_KEYS))
+        return RESPONSE_CACHE_PREFIX + digest.hexdigest()
+
+    @staticmethod
+    def _load_cached_result(cache_key: str) -> Optional[VideoPromptResult]:
+        """Stored result for an identical request, None on miss or Redis errors"""
         try:
-            # Generate with structured output
-            response = self.model.generate_content(
-                contents=[
-                    {"role": "user", "parts": [video_file]},
-                    {"role": "user", "parts": [system_prompt + "\n\n" + prompt]}
-                ],
-                generation_config={
-                    "temperature": 0.4,
-                    "response_mime_type": "application/json",
-                    "response_schema": json_schema,
-                }
+            cached = redis.Redis(connection_pool=_REDIS_POOL).get(cache_key)
+        except redis.RedisError:
+            return None
+        if cached is None:
+            return None
+        print("Using cached analysis result")
+        return VideoPromptResult.model_validate_json(cached)
+
+    @staticmethod
+    def _store_result(cache_key: str, result: VideoPromptResult):
+        """Store a result for identical follow-up requests (best effort)"""
+        try:
+            redis.Redis(connection_pool=_REDIS_POOL).set(
+                cache_key, result.model_dump_json(), ex=RESPONSE_CACHE_TTL
             )
+        except redis.RedisError:
+            pass
 
-            result_dict = json.loads(response.text)
-            # Handle nested response structure and normalize fields
-            result_dict = self._unwrap_response(result_dict, product_name, scenes, target_model)
-            return VideoPromptResult(**result_dict)
+    def _generate_primary(
+        self,
+        video_file,
+        prompt: str,
+        product_name: str,
+        scenes: List[Scene],
+        target_model: TargetModel
+    ) -> VideoPromptResult:
+        """Generate scene prompts with the primary model (structured output)"""
+        response = self._primary_model(target_model, structured=True).generate_content(
+            contents=[
+                {"role": "user", "parts": [video_file]},
+                {"role": "user", "parts": [prompt]}
+            ]
+        )
+        return self._parse_scene_response(response.text, product_name, scenes, target_model)
 
-        except Exception as e:
-            print(f"Primary model failed, trying fallback: {e}")
-            response = self.fallback_model.generate_content(
-                contents=[video_file, system_prompt + "\n\n" + prompt + "\n\nRespond with valid JSON only."]
-            )
-            result_dict = json.loads(response.text)
-            # Handle nested response structure and normalize fields
-            result_dict = self._unwrap_response(result_dict, product_name, scenes, target_model)
-            return VideoPromptResult(**result_dict)
+    def _generate_strict(
+        self,
+        video_file,
+        prompt: str,
+        product_name: str,
+        scenes: List[Scene],
+        target_model: TargetModel
+    ) -> VideoPromptResult:
+        """Retry the primary model after malformed output (low temperature, explicit JSON instruction)"""
+        self._configure()
+        model = _make_model(self.PRIMARY_MODEL, STRICT_TEMPERATURE, get_system_prompt(target_model), True)
+        response = model.generate_content(
+            contents=[
+                {"role": "user", "parts": [video_file]},
+                {"role": "user", "parts": [prompt + JSON_ONLY_SUFFIX]}
+            ]
+        )
+        return self._parse_scene_response(response.text, product_name, scenes, target_model)
+
+    def _parse_scene_response(
+        self,
+        text: str,
+        product_name: str,
+        scenes: List[Scene],
+        target_model: TargetModel
+    ) -> VideoPromptResult:
+        """Parse and validate a scene analysis response"""
+        # Structured output usually matches the schema exactly: parse and validate in one pass
+        try:
+            result = VideoPromptResult.model_validate_json(text)
+            if self._is_normalized(result):
+                return result
+        except ValidationError:
+            pass
+
+        result_dict = orjson.loads(text)
+        # Handle nested response structure and normalize fields
+        result_dict = self._unwrap_response(result_dict, product_name, scenes, target_model)
+        return VideoPromptResult.model_validate(result_dict)
+
+    @staticmethod
+    def _is_normalized(result: VideoPromptResult) -> bool:
+        """Whether a schema-valid result needs none of the fixes _unwrap_response applies"""
+        scene_prompts = result.scene_prompts
+        return bool(scene_prompts) and result.scene_count == len(scene_prompts) and all(
+            scene.duration != 0.0 or scene.end_time <= scene.start_time
+            for scene in scene_prompts
+        )
+
+    def _generate_fallback(
+        self,
+        video_file,
+        prompt: str,
+        product_name: str,
+        scenes: List[Scene],
+        target_model: TargetModel
+    ) -> VideoPromptResult:
+        """Generate scene prompts with the fallback model (plain JSON instruction)"""
+        response = self._fallback_model(target_model).generate_content(
+            contents=[video_file, prompt + JSON_ONLY_SUFFIX]
+        )
+        return self._parse_scene_response(response.text, product_name, scenes, target_model)
+
+    async def _generate_hedged(self, *args) -> VideoPromptResult:
+        """
+        Run the primary model and hedge with the fallback model.
+
+        The fallback starts once the primary has not answered within HEDGE_DELAY
+        seconds or failed with a transient API error; malformed output is retried
+        on the primary model instead, other errors are raised. The first
+        successful result wins.
+
+        Blocking SDK calls cannot be interrupted: the losing call keeps running
+        in the background until Gemini answers and is still billed. It runs on a
+        dedicated executor that is shut down without waiting, so neither this
+        coroutine nor asyncio.run (sync callers) waits for it.
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-hedge")
+        try:
+            primary = loop.run_in_executor(executor, self._generate_primary, *args)
+            done, _ = await asyncio.wait({primary}, timeout=HEDGE_DELAY)
+            if primary in done and primary.exception() is None:
+                return primary.result()
+
+            hedge = self._generate_fallback
+            if primary in done:
+                error = primary.exception()
+                if isinstance(error, MALFORMED_OUTPUT_ERRORS):
+                    print(f"Primary model returned malformed output ({type(error).__name__}), retrying strictly: {error}")
+                    hedge = self._generate_strict
+                elif isinstance(error, FALLBACK_ERRORS):
+                    print(f"Primary model failed ({type(error).__name__}), trying fallback: {error}")
+                else:
+                    raise error
+            else:
+                print(f"Primary model slower than {HEDGE_DELAY}s, starting hedged fallback")
+            fallback = loop.run_in_executor(executor, hedge, *args)
+
+            pending = {fallback} if primary in done else {primary, fallback}
+            error = primary.exception() if primary in done else None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        for other in pending:
+                            other.cancel()
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            executor.shutdown(wait=False)
 
     def analyze_video_for_clips(
         self,
@@ -427,7 +1046,8 @@ class GeminiAnalyzer:
         product_name: str,
         clip_segments: List[dict],  # List of ClipSegment as dicts
         target_model: TargetModel = TargetModel.SORA_2,
-        transcript: Optional[TranscriptResult] = None
+        transcript: Optional[TranscriptResult] = None,
+        use_cache: bool = True
     ) -> VideoPromptResult:
         """
         Analyze video and generate optimized prompts for each CLIP segment.
@@ -441,60 +1061,56 @@ class GeminiAnalyzer:
             clip_segments: List of ClipSegment dicts with start_time, end_time, duration, pacing_note
             target_model: Which model to optimize prompts for
             transcript: Pre-extracted transcript with timestamps
+            use_cache: Reuse a stored result of an identical request (False forces a fresh analysis)
 
         Returns:
             VideoPromptResult with clip_prompts list
         """
+        # Skip transcript, upload and generation for a request that was answered before
+        video_digest = self._video_digest(video_path)
+        cache_key = self._response_cache_key(
+            video_digest, target_model, "clips", product_name, clip_segments, transcript
+        )
+        cached = self._load_cached_result(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+
         # Extract transcript if not provided
         if transcript is None:
-            print("Extracting transcript from video...")
-            transcript = transcript_extractor.extract_transcript(video_path)
-            print(f"Transcript extracted: {len(transcript.segments)} segments, language: {transcript.language}")
-
-        # Upload video to Gemini File API
-        video_file = genai.upload_file(video_path)
-
-        # Wait for processing
-        import time
-        while video_file.state.name == "PROCESSING":
-            time.sleep(2)
-            video_file = genai.get_file(video_file.name)
-
-        if video_file.state.name == "FAILED":
-            raise ValueError(f"Video processing failed: {video_file.state.name}")
+            transcript = self._extract_transcript(video_path)
 
         # Build clip-based prompt
         prompt = self._build_clip_prompt(product_name, clip_segments, transcript, target_model)
 
-        if target_model == TargetModel.SORA_2:
-            system_prompt = SORA_2_SYSTEM_PROMPT
-        else:
-            system_prompt = VEO_3_SYSTEM_PROMPT
+        # Upload video to Gemini File API and wait for processing
+        video_file = self._upload_video(video_path, video_digest)
 
-        try:
-            response = self.model.generate_content(
-                contents=[
-                    {"role": "user", "parts": [video_file]},
-                    {"role": "user", "parts": [system_prompt + "\n\n" + prompt]}
-                ],
-                generation_config={
-                    "temperature": 0.4,
-                    "response_mime_type": "application/json",
-                }
-            )
-
-            result_dict = json.loads(response.text)
+        def generate(model: genai.GenerativeModel, contents: list) -> VideoPromptResult:
+            response = model.generate_content(contents=contents)
+            result_dict = orjson.loads(response.text)
             result_dict = self._process_clip_response(result_dict, product_name, clip_segments, target_model, transcript)
-            return VideoPromptResult(**result_dict)
+            return VideoPromptResult.model_validate(result_dict)
 
-        except Exception as e:
-            print(f"Primary model failed for clips, trying fallback: {e}")
-            response = self.fallback_model.generate_content(
-                contents=[video_file, system_prompt + "\n\n" + prompt + "\n\nRespond with valid JSON only."]
-            )
-            result_dict = json.loads(response.text)
-            result_dict = self._process_clip_response(result_dict, product_name, clip_segments, target_model, transcript)
-            return VideoPromptResult(**result_dict)
+        try:
+            result = generate(self._primary_model(target_model), [
+                {"role": "user", "parts": [video_file]},
+                {"role": "user", "parts": [prompt]}
+            ])
+
+        except FALLBACK_ERRORS as e:
+            print(f"Primary model failed for clips ({type(e).__name__}), trying fallback: {e}")
+            result = generate(self._fallback_model(target_model), [video_file, prompt + JSON_ONLY_SUFFIX])
+
+        except MALFORMED_OUTPUT_ERRORS as e:
+            print(f"Primary model returned malformed clips ({type(e).__name__}), retrying strictly: {e}")
+            strict_model = _make_model(self.PRIMARY_MODEL, STRICT_TEMPERATURE, get_system_prompt(target_model))
+            result = generate(strict_model, [
+                {"role": "user", "parts": [video_file]},
+                {"role": "user", "parts": [prompt + JSON_ONLY_SUFFIX]}
+            ])
+
+        self._store_result(cache_key, result)
+        return result
 
     def _build_clip_prompt(
         self,
@@ -506,7 +1122,11 @@ class GeminiAnalyzer:
         """Build prompt for clip-based analysis."""
 
         # Build clip info with transcript portions
+        # Videos without speech skip the per-clip transcript lookups entirely
+        text_between = _speech_lookup(transcript)
+        fmt = self._format_time
         clip_info_parts = []
+        append = clip_info_parts.append
         for clip in clip_segments:
             clip_start = clip.get("start_time", 0)
             clip_end = clip.get("end_time", 0)
@@ -514,20 +1134,18 @@ class GeminiAnalyzer:
             target_dur = clip.get("target_duration", clip_duration)
             pacing_note = clip.get("pacing_note", "")
 
-            clip_line = f"  CLIP {clip.get('clip_index', 0) + 1}: {self._format_time(clip_start)} - {self._format_time(clip_end)} ({clip_duration:.1f}s → generate {target_dur:.1f}s)"
+            clip_line = f"  CLIP {clip.get('clip_index', 0) + 1}: {fmt(clip_start)} - {fmt(clip_end)} ({clip_duration:.1f}s → generate {target_dur:.1f}s)"
 
             # Get transcript for this clip
-            if transcript and transcript.segments:
-                clip_transcript = transcript_extractor.get_transcript_for_timerange(
-                    transcript, clip_start, clip_end
-                )
+            if text_between:
+                clip_transcript = text_between(clip_start, clip_end)
                 if clip_transcript:
                     clip_line += f"\n    TRANSCRIPT: \"{clip_transcript}\""
 
             if pacing_note:
                 clip_line += f"\n    {pacing_note}"
 
-            clip_info_parts.append(clip_line)
+            append(clip_line)
 
         clip_info = "\n".join(clip_info_parts)
         total_duration = clip_segments[-1].get("end_time", 0) if clip_segments else 0
@@ -535,74 +1153,18 @@ class GeminiAnalyzer:
         # Full transcript
         transcript_section = ""
         if transcript and transcript.has_speech:
-            transcript_section = f"""
-## FULL TRANSCRIPT
-Language: {transcript.language}
-"{transcript.full_text}"
-
-**IMPORTANT: Distribute this transcript across the clips. Each clip should contain the portion of speech that occurs during that time range.**
-"""
-
-        return f"""## TASK: GENERATE PROMPTS FOR {len(clip_segments)} CLIPS
-
-Analyze this product video for "{product_name}" and generate ONE PROMPT PER CLIP.
-
-## CLIP SEGMENTS (time-based, NOT scene-based):
-{clip_info}
-{transcript_section}
-## CRITICAL REQUIREMENTS:
-
-1. **ONE PROMPT PER CLIP** - You must generate exactly {len(clip_segments)} prompts, one for each clip segment above.
-
-2. **VISUAL CLONING** - Each prompt must describe the EXACT visual appearance:
-   - Person: gender, age, beard, hair, EXACT clothing with colors/logos
-   - Background: room type, wall colors, visible objects (doors, furniture)
-   - Camera: shot type, angle, position in frame
-   - Lighting: direction, quality (soft/harsh, natural/artificial)
-
-3. **TRANSCRIPT DISTRIBUTION** - Distribute the full transcript across clips:
-   - Clip 1: First portion of dialogue
-   - Clip 2: Next portion of dialogue
-   - etc.
-   - DO NOT repeat dialogue across clips!
-   - Each clip should have unique dialogue matching its time range
-
-4. **VISUAL CONSISTENCY** - All clips must have IDENTICAL:
-   - Person appearance (same clothing, same person)
-   - Background (same room, same objects)
-   - Lighting setup
-   - Camera style
-   Only the ACTION and DIALOGUE should differ between clips.
-
-## OUTPUT FORMAT
+            transcript_section = FULL_TRANSCRIPT_SECTION.format(
+                language=transcript.language, full_text=transcript.full_text
+            )
 
-Return JSON with this structure:
-{{
-  "product_name": "{product_name}",
-  "target_model": "{target_model.value}",
-  "total_duration": {total_duration:.1f},
-  "clip_prompts": [
-    {{
-      "clip_index": 0,
-      "start_time": ...,
-      "end_time": ...,
-      "duration": ...,
-      "target_duration": ...,
-      "prompt": "Full detailed prompt for clip 1...",
-      "transcript_text": "Exact dialogue for clip 1...",
-      "person_description": "...",
-      "background_description": "...",
-      "camera_description": "...",
-      "lighting_description": "...",
-      "action_description": "..."
-    }},
-    // ... one entry per clip
-  ],
-  "scene_prompts": [],
-  "visual_style": "...",
-  "color_palette": "...",
-  "film_reference": "..."
-}}"""
+        return CLIP_ANALYSIS_TEMPLATE.format(
+            clip_count=len(clip_segments),
+            product_name=product_name,
+            clip_info=clip_info,
+            transcript_section=transcript_section,
+            target_model=target_model.value,
+            total_duration=total_duration,
+        )
 
     def _process_clip_response(
         self,
@@ -615,36 +1177,29 @@ Return JSON with this structure:
         """Process and normalize clip-based response from Gemini."""
 
         # Unwrap if nested
-        if len(result_dict) == 1:
-            key = list(result_dict.keys())[0]
-            if isinstance(result_dict[key], dict) and key[0].isupper():
-                result_dict = result_dict[key]
+        result_dict = _unwrap_class_name(result_dict)
 
         # Ensure required fields
-        result_dict.setdefault("product_name", product_name)
-        result_dict.setdefault("target_model", target_model.value)
-        result_dict.setdefault("total_duration", clip_segments[-1].get("end_time", 0) if clip_segments else 0)
+        self._apply_result_defaults(
+            result_dict, product_name, target_model,
+            clip_segments[-1].get("end_time", 0) if clip_segments else 0
+        )
         result_dict.setdefault("scene_count", len(clip_segments))
         result_dict.setdefault("scene_prompts", [])  # Empty for clip-based
-        result_dict.setdefault("visual_style", "cinematic commercial style")
-        result_dict.setdefault("color_palette", "warm, natural tones")
-        result_dict.setdefault("film_reference", "modern digital commercial")
-        result_dict.setdefault("full_video_prompt", None)
 
         # Ensure clip_prompts exists with fallback
         if "clip_prompts" not in result_dict or not result_dict["clip_prompts"]:
             # Create fallback prompts
             result_dict["clip_prompts"] = []
+            text_between = _speech_lookup(transcript)
             for clip in clip_segments:
                 clip_start = clip.get("start_time", 0)
                 clip_end = clip.get("end_time", 0)
 
                 # Get transcript for this clip
                 clip_transcript = ""
-                if transcript and transcript.segments:
-                    clip_transcript = transcript_extractor.get_transcript_for_timerange(
-                        transcript, clip_start, clip_end
-                    ) or ""
+                if text_between:
+                    clip_transcript = text_between(clip_start, clip_end)
 
                 result_dict["clip_prompts"].append({
                     "clip_index": clip.get("clip_index", 0),
@@ -671,201 +1226,71 @@ Return JSON with this structure:
                 "end_time": clip.get("end_time", orig_clip.get("end_time", 0)),
                 "duration": clip.get("duration", orig_clip.get("duration", 0)),
                 "target_duration": clip.get("target_duration", orig_clip.get("target_duration", 15)),
-                "prompt": clip.get("prompt", ""),
-                "transcript_text": clip.get("transcript_text", ""),
-                "person_description": clip.get("person_description", ""),
-                "background_description": clip.get("background_description", ""),
-                "camera_description": clip.get("camera_description", ""),
-                "lighting_description": clip.get("lighting_description", ""),
-                "action_description": clip.get("action_description", "")
             }
+            for field in _CLIP_TEXT_FIELDS:
+                normalized[field] = clip.get(field, "")
             normalized_clips.append(normalized)
 
         result_dict["clip_prompts"] = normalized_clips
 
         return result_dict
 
-    def _build_sora_prompt(self, product_name: str, scenes: List[Scene], transcript: Optional[TranscriptResult] = None) -> str:
-        """Build analysis prompt optimized for Sora 2 output."""
-
-        scene_info_parts = []
-        for s in scenes:
-            scene_line = f"  Scene {s.index + 1}: {self._format_time(s.start_time)} - {self._format_time(s.end_time)} ({s.duration:.1f}s)"
+    def _build_scene_info(self, scenes: List[Scene], transcript: Optional[TranscriptResult]) -> str:
+        """Scene list (with spoken text per scene) for the analysis prompt."""
+        buf = io.StringIO()
+        write = buf.write
+        fmt = self._format_time
+        # Videos without speech skip the per-scene transcript lookups entirely
+        text_between = _speech_lookup(transcript)
+
+        for n, s in enumerate(scenes):
+            if n:
+                write("\n")
+            write(f"  Scene {s.index + 1}: {fmt(s.start_time)} - {fmt(s.end_time)} ({s.duration:.1f}s)")
             # Add transcript for this scene if available
-            if transcript and transcript.segments:
-                scene_transcript = transcript_extractor.get_transcript_for_timerange(
-                    transcript, s.start_time, s.end_time
-                )
+            if text_between:
+                scene_transcript = text_between(s.start_time, s.end_time)
                 if scene_transcript:
-                    scene_line += f"\n    SPOKEN TEXT: \"{scene_transcript}\""
-            scene_info_parts.append(scene_line)
+                    write(f"\n    SPOKEN TEXT: \"{scene_transcript}\"")
 
-        scene_info = "\n".join(scene_info_parts)
-        total_duration = scenes[-1].end_time if scenes else 0
+        return buf.getvalue()
 
-        # Build transcript section
-        transcript_section = ""
+    @staticmethod
+    def _build_transcript_section(transcript: Optional[TranscriptResult]) -> str:
+        """Exact-transcript section for scene analysis prompts (empty without speech)"""
         if transcript and transcript.has_speech:
-            transcript_section = f"""
-## EXACT TRANSCRIPT (USE THIS - DO NOT MAKE UP TEXT!)
-Language: {transcript.language}
-Full transcript: "{transcript.full_text}"
-
-**CRITICAL: The dialogue/voiceover above is EXACT. Use these EXACT words in the prompts!**
-"""
-
-        return f"""## TASK: VISUAL CLONING
-Analyze this product video for "{product_name}" and generate SORA 2 OPTIMIZED prompts that will create a video VISUALLY IDENTICAL to the original.
-
-**CRITICAL**: Sora 2 CANNOT see the original video. It only receives your text description.
-Your prompts must describe EVERY visual detail so precisely that the generated video matches the original.
+            return EXACT_TRANSCRIPT_SECTION.format(language=transcript.language, full_text=transcript.full_text)
+        return ""
 
-## VIDEO INFO
-- Product: {product_name}
-- Duration: {total_duration:.1f} seconds
-- Scenes detected:
-{scene_info}
-{transcript_section}
-## YOUR OUTPUT - MANDATORY DETAILS FOR EACH SCENE:
-
-### 1. PERSON ANALYSIS (if person appears):
-- Gender (male/female)
-- Age range
-- Facial features (beard, glasses, hair color/style)
-- EXACT clothing with colors and any visible logos/patches
-- Example: "young man with dark full beard, short black hair, dark grey t-shirt with Germany flag patch"
-
-### 2. BACKGROUND ANALYSIS:
-- Room type and wall colors
-- Visible objects (doors, furniture, decorations)
-- Example: "modern minimal room, off-white walls, black door handle visible on left"
-
-### 3. CAMERA ANALYSIS:
-- Shot type (medium, close-up, selfie-style)
-- Person's position in frame
-- Camera angle
-
-### 4. LIGHTING ANALYSIS:
-- Light source direction
-- Quality (soft/harsh, natural/artificial)
-
-### 5. ACTION ANALYSIS:
-- What the person is doing
-- Hand gestures
-- Facial expression
-
-### 6. ON-SCREEN TEXT (if any):
-- Exact text content
-- Position and style
-
-## PROMPT FORMAT FOR EACH SCENE:
-```
-A [age] [gender] with [facial features], wearing [exact clothing description], [stands/sits] in [exact room description with wall color and visible objects].
-[Shot type] at [camera angle], [lighting description].
-[He/She] [exact action] while [speaking to camera / gesturing].
-[On-screen text if present: "exact text"]
-
-Cinematography:
-Camera shot: [specific framing]
-Camera movement: [static/movement type]
-Lens: [focal length]
-Mood: [tone]
-
-Actions:
-- [Specific gesture 1]
-- [Specific gesture 2]
-
-[EXACT dialogue from transcript if speaking]
-```
-
-## CRITICAL REMINDERS:
-- **PERSON DETAILS ARE MANDATORY**: Never say "a person" - always specify gender, appearance, clothing
-- **BACKGROUND DETAILS ARE MANDATORY**: Never say "a room" - describe wall color, visible objects
-- **Be SPECIFIC**: Every detail matters for visual matching
-- **DIALOGUE MUST BE EXACT**: Use the transcript word-for-word
-
-## OUTPUT FORMAT
-Return a VideoPromptResult JSON with target_model="sora-2" and detailed prompts for each scene."""
+    def _build_sora_prompt(
+        self,
+        product_name: str,
+        scene_info: str,
+        total_duration: float,
+        transcript_section: str = ""
+    ) -> str:
+        """Build analysis prompt optimized for Sora 2 output."""
+        return SORA_2_ANALYSIS_TEMPLATE.format(
+            product_name=product_name,
+            total_duration=total_duration,
+            scene_info=scene_info,
+            transcript_section=transcript_section,
+        )
 
-    def _build_veo_prompt(self, product_name: str, scenes: List[Scene], transcript: Optional[TranscriptResult] = None) -> str:
+    def _build_veo_prompt(
+        self,
+        product_name: str,
+        scene_info: str,
+        total_duration: float,
+        transcript_section: str = ""
+    ) -> str:
         """Build analysis prompt optimized for Veo 3.1 output."""
-
-        scene_info_parts = []
-        for s in scenes:
-            scene_line = f"  Scene {s.index + 1}: {self._format_time(s.start_time)} - {self._format_time(s.end_time)} ({s.duration:.1f}s)"
-            # Add transcript for this scene if available
-            if transcript and transcript.segments:
-                scene_transcript = transcript_extractor.get_transcript_for_timerange(
-                    transcript, s.start_time, s.end_time
-                )
-                if scene_transcript:
-                    scene_line += f"\n    SPOKEN TEXT: \"{scene_transcript}\""
-            scene_info_parts.append(scene_line)
-
-        scene_info = "\n".join(scene_info_parts)
-        total_duration = scenes[-1].end_time if scenes else 0
-
-        # Build transcript section
-        transcript_section = ""
-        if transcript and transcript.has_speech:
-            transcript_section = f"""
-## EXACT TRANSCRIPT (USE THIS - DO NOT MAKE UP TEXT!)
-Language: {transcript.language}
-Full transcript: "{transcript.full_text}"
-
-**CRITICAL: The dialogue/voiceover above is EXACT. Use these EXACT words in the prompts!**
-"""
-
-        return f"""## TASK
-Analyze this product video for "{product_name}" and generate VEO 3.1 OPTIMIZED prompts for each scene.
-
-## VIDEO INFO
-- Product: {product_name}
-- Duration: {total_duration:.1f} seconds
-- Scenes detected:
-{scene_info}
-{transcript_section}
-## YOUR OUTPUT
-
-For EACH scene, generate a prompt using Veo 3.1's 5-part formula:
-[Cinematography] + [Subject] + [Action] + [Context] + [Style & Ambiance]
-
-1. **Analyze the scene:**
-   - Camera shot type and movement
-   - How {product_name} appears in frame
-   - What action/movement is shown
-   - Environment and setting
-   - Lighting and color mood
-
-2. **Generate VEO 3.1 prompt using this structure:**
-```
-[Shot type and camera movement], [subject showing {product_name}], [action being performed],
-[environment details], [style and lighting description].
-[Audio: A person says, "EXACT transcript text here." (no subtitles)]
-```
-
-## VEO 3.1 SPECIFIC FORMATTING:
-- Dialogue: A person says, "exact words here." (no subtitles) - USE EXACT TRANSCRIPT!
-- Sound effects: SFX: description of sound
-- Ambient: Ambient noise: background description
-
-## TIMESTAMP PROMPT (for full_video_prompt):
-Also create a timestamp-based prompt combining all scenes:
-```
-[00:00-00:02] First scene description...
-[00:02-00:04] Second scene description...
-```
-
-## CRITICAL REMINDERS FOR VEO 3.1:
-- Use VEO camera vocabulary: dolly shot, tracking shot, crane shot, shallow DOF
-- Specify lighting explicitly: soft window light, dramatic spotlight, warm fill
-- Include color/mood: "warm color palette", "clean minimal aesthetic"
-- Keep descriptions VISUAL - what the camera sees
-- **DIALOGUE MUST BE EXACT**: Use the transcript text word-for-word, do NOT paraphrase!
-
-## OUTPUT FORMAT
-Return a VideoPromptResult JSON with target_model="veo-3.1" and optimized prompts for each scene.
-Include full_video_prompt with timestamp-based prompt for seamless generation."""
+        return VEO_3_ANALYSIS_TEMPLATE.format(
+            product_name=product_name,
+            total_duration=total_duration,
+            scene_info=scene_info,
+            transcript_section=transcript_section,
+        )
 
     def _unwrap_response(self, result_dict: dict, product_name: str, scenes: List[Scene], target_model: TargetModel = TargetModel.VEO_3) -> dict:
         """
@@ -873,24 +1298,12 @@ Include full_video_prompt with timestamp-based prompt for seamless generation.""
         Sometimes the API wraps the result or uses different field names.
         """
         # Check if wrapped in class name
-        if len(result_dict) == 1:
-            key = list(result_dict.keys())[0]
-            if isinstance(result_dict[key], dict) and key[0].isupper():
-                result_dict = result_dict[key]
+        result_dict = _unwrap_class_name(result_dict)
 
         # Add missing top-level fields with defaults
-        if "product_name" not in result_dict:
-            result_dict["product_name"] = product_name
-        if "target_model" not in result_dict:
-            result_dict["target_model"] = target_model.value  # Use actual target model
-        if "total_duration" not in result_dict:
-            result_dict["total_duration"] = scenes[-1].end_time if scenes else 0.0
-        if "visual_style" not in result_dict:
-            result_dict["visual_style"] = "cinematic commercial style"
-        if "color_palette" not in result_dict:
-            result_dict["color_palette"] = "warm, natural tones"
-        if "film_reference" not in result_dict:
-            result_dict["film_reference"] = "modern digital commercial"
+        self._apply_result_defaults(
+            result_dict, product_name, target_model, scenes[-1].end_time if scenes else 0.0
+        )
 
         # CRITICAL: Ensure scene_prompts exists with default fallback
         if "scene_prompts" not in result_dict or not result_dict["scene_prompts"]:
@@ -923,12 +1336,25 @@ Include full_video_prompt with timestamp-based prompt for seamless generation.""
         # Update scene_count after normalization
         result_dict["scene_count"] = len(result_dict["scene_prompts"])
 
-        # CRITICAL: Ensure full_video_prompt exists (can be None but must be present)
-        if "full_video_prompt" not in result_dict:
-            result_dict["full_video_prompt"] = None
-
         return result_dict
 
+    @staticmethod
+    def _apply_result_defaults(
+        result_dict: dict,
+        product_name: str,
+        target_model: TargetModel,
+        total_duration: float
+    ):
+        """Fill in top-level VideoPromptResult fields the model left out"""
+        setdefault = result_dict.setdefault
+        setdefault("product_name", product_name)
+        setdefault("target_model", target_model.value)  # Use actual target model
+        setdefault("total_duration", total_duration)
+        for field, default in _STYLE_DEFAULTS.items():
+            setdefault(field, default)
+        # full_video_prompt can be None but must be present
+        setdefault("full_video_prompt", None)
+
     def _normalize_scene(self, scene: dict, index: int, scenes: List[Scene]) -> dict:
         """Normalize a single scene prompt to match expected schema."""
         # Get original scene info if available
@@ -940,15 +1366,11 @@ Include full_video_prompt with timestamp-based prompt for seamless generation.""
             "start_time": self._parse_time(scene.get("start_time", orig_scene.start_time if orig_scene else 0.0)),
             "end_time": self._parse_time(scene.get("end_time", orig_scene.end_time if orig_scene else 0.0)),
             "duration": scene.get("duration", orig_scene.duration if orig_scene else 0.0),
-            "prompt": scene.get("prompt", scene.get("video_prompt", scene.get("scene_prompt", ""))),
-            "camera_shot": scene.get("camera_shot", scene.get("shot_type", "medium shot")),
-            "camera_movement": scene.get("camera_movement", scene.get("movement", "static")),
-            "subject_action": scene.get("subject_action", scene.get("action", "product display")),
-            "lighting": scene.get("lighting", scene.get("light", "soft natural light")),
-            "mood": scene.get("mood", scene.get("atmosphere", "professional")),
-            "has_audio": scene.get("has_audio", bool(scene.get("audio_description") or scene.get("dialogue"))),
-            "audio_description": scene.get("audio_description", scene.get("dialogue", None)),
         }
+        for field, names, default in _SCENE_TEXT_FIELDS:
+            normalized[field] = _first_present(scene, names, default)
+        normalized["has_audio"] = scene.get("has_audio", bool(scene.get("audio_description") or scene.get("dialogue")))
+        normalized["audio_description"] = _first_present(scene, ("audio_description", "dialogue"), None)
 
         # Calculate duration if missing
         if normalized["duration"] == 0.0 and normalized["end_time"] > normalized["start_time"]:
@@ -956,28 +1378,22 @@ Include full_video_prompt with timestamp-based prompt for seamless generation.""
 
         return normalized
 
-    def _parse_time(self, time_value) -> float:
+    @staticmethod
+    def _parse_time(time_value) -> float:
         """Parse time value from various formats to float seconds."""
         if isinstance(time_value, (int, float)):
             return float(time_value)
         if isinstance(time_value, str):
-            # Handle MM:SS or HH:MM:SS format
-            parts = time_value.split(":")
-            if len(parts) == 2:
-                return float(parts[0]) * 60 + float(parts[1])
-            elif len(parts) == 3:
-                return float(parts[0]) * 3600 + float(parts[1]) * 60 + float(parts[2])
-            # Try direct float conversion
-            try:
-                return float(time_value)
-            except ValueError:
-                return 0.0
+            return _parse_time_string(time_value)
         return 0.0
 
-    def _format_time(self, seconds: float) -> str:
+    @staticmethod
+    def _format_time(seconds: float) -> str:
         """Format seconds as MM:SS"""
-        mins = int(seconds // 60)
-        secs = int(seconds % 60)
+        whole = int(seconds)
+        if 0 <= whole < len(_MMSS):
+            return _MMSS[whole]
+        mins, secs = divmod(whole, 60)
         return f"{mins:02d}:{secs:02d}"
 
 
@@ -1,9 +1,12 @@
-import base64
 import io
+import mmap
+import os
+import shutil
 import subprocess
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import BinaryIO, Optional, Tuple
 
+import pybase64
 from PIL import Image
 
 from config import settings
@@ -16,7 +19,12 @@ class ImageProcessor:
     # Supported formats
     ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
     MAX_SIZE_MB = 10
+    MAX_PIXELS = 100_000_000  # 100MP, checked from the header before any decode
     TARGET_SIZE = (1024, 1024)  # Max dimensions for API uploads
+    COPY_CHUNK_SIZE = 1 << 20  # 1MB chunks when streaming uploads to disk
+    B64_CHUNK_SIZE = 3 << 16  # 192KB, a multiple of 3 so chunks encode without padding
+    B64_SUFFIX = ".b64"  # Sidecar file holding the pre-encoded image next to product.jpg
+    FRAME_JPEG_QUALITY = 92  # Extracted last frames are re-uploaded as start images
 
     def __init__(self):
         self.storage_path = Path(settings.storage_path)
@@ -24,26 +32,34 @@ class ImageProcessor:
 
     def save_product_image(
         self,
-        image_data: bytes,
+        image_file: BinaryIO,
         session_id: str,
         filename: str = "product.jpg"
     ) -> str:
         """
         Save uploaded product image.
 
+        The upload is streamed to disk in chunks instead of being read into memory,
+        Pillow then opens it lazily from the saved file.
+
         Args:
-            image_data: Raw image bytes
+            image_file: Binary file object with the uploaded image
             session_id: Session ID for organization
             filename: Original filename
 
         Returns:
             Path to saved image
         """
+        # Determine upload size without reading it
+        image_file.seek(0, io.SEEK_END)
+        data_size = image_file.tell()
+        image_file.seek(0)
+
         self.logger.set_session(session_id)
         self.logger.info("IMAGE_SAVE", f"Saving product image: {filename}", {
             "filename": filename,
-            "data_size_bytes": len(image_data),
-            "data_size_mb": round(len(image_data) / (1024 * 1024), 2),
+            "data_size_bytes": data_size,
+            "data_size_mb": round(data_size / (1024 * 1024), 2),
         })
 
         # Validate extension
@@ -53,7 +69,7 @@ class ImageProcessor:
             raise ValueError(f"Unsupported image format: {ext}")
 
         # Validate size
-        size_mb = len(image_data) / (1024 * 1024)
+        size_mb = data_size / (1024 * 1024)
         if size_mb > self.MAX_SIZE_MB:
             self.logger.error("IMAGE_SAVE", f"Image too large: {size_mb:.1f}MB", data={"size_mb": size_mb})
             raise ValueError(f"Image too large: {size_mb:.1f}MB (max {self.MAX_SIZE_MB}MB)")
@@ -62,16 +78,105 @@ class ImageProcessor:
         output_dir = self.storage_path / session_id
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Process and optimize image
-        image = Image.open(io.BytesIO(image_data))
-        original_size = image.size
+        # Stream raw upload to disk
+        upload_path = output_dir / f"product_upload{ext}"
+        with open(upload_path, "wb") as out:
+            shutil.copyfileobj(image_file, out, length=self.COPY_CHUNK_SIZE)
+
+        try:
+            output_path = self._optimize_image(upload_path, output_dir)
+        finally:
+            upload_path.unlink(missing_ok=True)
+
+        return str(output_path)
+
+    def _optimize_image(self, upload_path: Path, output_dir: Path) -> Path:
+        """Convert, resize and save the uploaded image as optimized JPEG"""
+        with Image.open(upload_path) as image:  # Header only, pixels are not decoded here
+            original_size, image_format = image.size, image.format
+            self.logger.info("IMAGE_SAVE", f"Original image: {original_size[0]}x{original_size[1]}, mode={image.mode}", {
+                "original_width": original_size[0],
+                "original_height": original_size[1],
+                "mode": image.mode,
+            })
+
+        # Validate pixel count (guards against decompression bombs)
+        pixels = original_size[0] * original_size[1]
+        if pixels > self.MAX_PIXELS:
+            self.logger.error("IMAGE_SAVE", f"Image too large: {pixels / 1e6:.0f}MP", data={"pixels": pixels})
+            raise ValueError(f"Image too large: {pixels / 1e6:.0f}MP (max {self.MAX_PIXELS // 1_000_000}MP)")
+
+        output_path = output_dir / "product.jpg"
+        dimensions = self._resize_cv2(upload_path, output_path, original_size, image_format)
+        if dimensions is None:
+            dimensions = self._resize_pillow(upload_path, output_path)
+
+        # Encode once here, every later get_base64 call just reads the sidecar
+        self._b64_path(output_path).write_text(self._encode_file(output_path))
 
-        self.logger.info("IMAGE_SAVE", f"Original image: {original_size[0]}x{original_size[1]}, mode={image.mode}", {
-            "original_width": original_size[0],
-            "original_height": original_size[1],
-            "mode": image.mode,
+        final_size = output_path.stat().st_size
+        self.logger.success("IMAGE_SAVE", f"Product image saved: {output_path}", {
+            "output_path": str(output_path),
+            "final_size_bytes": final_size,
+            "final_dimensions": f"{dimensions[0]}x{dimensions[1]}",
         })
 
+        return output_path
+
+    def _resize_cv2(
+        self,
+        upload_path: Path,
+        output_path: Path,
+        size: Tuple[int, int],
+        image_format: Optional[str]
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Decode, downscale (INTER_AREA) and save the image as JPEG with OpenCV.
+
+        Returns the final dimensions, or None if OpenCV is unavailable or cannot
+        handle the file so the caller falls back to Pillow.
+        """
+        try:
+            import cv2
+        except ImportError:
+            return None
+
+        # Let libjpeg decode oversized JPEGs at 1/2, 1/4 or 1/8 scale (DCT scaling)
+        flags = cv2.IMREAD_COLOR
+        scale = max(size) // self.TARGET_SIZE[0]
+        if image_format == "JPEG":
+            for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if scale >= factor:
+                    flags = reduced
+                    break
+        # Keep EXIF orientation handling identical to the Pillow path
+        image = cv2.imread(str(upload_path), flags | cv2.IMREAD_IGNORE_ORIENTATION)
+        if image is None:
+            return None
+
+        height, width = image.shape[:2]
+        ratio = min(self.TARGET_SIZE[0] / width, self.TARGET_SIZE[1] / height)
+        if ratio < 1:
+            new_size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+            self.logger.info("IMAGE_SAVE", f"Resizing from {(width, height)} to {new_size}")
+            image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+        params = [cv2.IMWRITE_JPEG_QUALITY, settings.jpeg_quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+        if not cv2.imwrite(str(output_path), image, params):
+            return None
+
+        return image.shape[1], image.shape[0]
+
+    def _resize_pillow(self, upload_path: Path, output_path: Path) -> Tuple[int, int]:
+        """Decode, downscale (LANCZOS) and save the image as JPEG with Pillow"""
+        image = Image.open(upload_path)
+
+        # Let libjpeg decode oversized JPEGs at 1/2, 1/4 or 1/8 scale (DCT scaling)
+        scale = min(max(image.size) // self.TARGET_SIZE[0], 8)
+        if scale >= 2 and image.format == "JPEG":
+            image.draft("RGB", (image.width // scale, image.height // scale))
+            self.logger.info("IMAGE_SAVE", f"Draft decoding at {image.size}", {"draft_scale": scale})
+
         # Convert to RGB if necessary (for JPEG compatibility)
         if image.mode in ("RGBA", "P"):
             self.logger.info("IMAGE_SAVE", f"Converting from {image.mode} to RGB")
@@ -82,28 +187,50 @@ class ImageProcessor:
             self.logger.info("IMAGE_SAVE", f"Resizing from {image.size} to max {self.TARGET_SIZE}")
             image.thumbnail(self.TARGET_SIZE, Image.Resampling.LANCZOS)
 
-        # Save as optimized JPEG
-        output_path = output_dir / "product.jpg"
-        image.save(output_path, "JPEG", quality=90, optimize=True)
+        # Save as JPEG (single Huffman pass, 4:2:0 chroma subsampling)
+        image.save(output_path, "JPEG", quality=settings.jpeg_quality, optimize=False, subsampling=2)
 
-        final_size = output_path.stat().st_size
-        self.logger.success("IMAGE_SAVE", f"Product image saved: {output_path}", {
-            "output_path": str(output_path),
-            "final_size_bytes": final_size,
-            "final_dimensions": f"{image.width}x{image.height}",
-        })
-
-        return str(output_path)
+        return image.size
 
     def get_base64(self, image_path: str) -> str:
         """Get base64 encoded image for API requests"""
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
+        return self._load_base64(image_path)
 
     def get_data_uri(self, image_path: str) -> str:
         """Get data URI for image (for HTML/API embedding)"""
-        b64 = self.get_base64(image_path)
-        return f"data:image/jpeg;base64,{b64}"
+        return self._load_base64(image_path, "data:image/jpeg;base64,")
+
+    def _load_base64(self, image_path: str, prefix: str = "") -> str:
+        """Prefixed base64 of an image, from the .b64 sidecar if it is up to date"""
+        b64_path = self._b64_path(image_path)
+        try:
+            if b64_path.stat().st_mtime >= Path(image_path).stat().st_mtime:
+                # Read the sidecar straight behind the prefix, no separate concatenation
+                header = prefix.encode("ascii")
+                with open(b64_path, "rb") as f:
+                    buf = bytearray(len(header) + os.fstat(f.fileno()).st_size)
+                    buf[:len(header)] = header
+                    f.readinto(memoryview(buf)[len(header):])
+                return buf.decode("ascii")
+        except FileNotFoundError:
+            pass
+        return self._encode_file(image_path, prefix)
+
+    def _b64_path(self, image_path) -> Path:
+        """Path of the base64 sidecar file of an image"""
+        image_path = Path(image_path)
+        return image_path.with_name(image_path.name + self.B64_SUFFIX)
+
+    def _encode_file(self, image_path: str, prefix: str = "") -> str:
+        """Base64-encode a memory-mapped file chunk by chunk, without copying it into user space"""
+        parts = [prefix]
+        with open(image_path, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return prefix  # Empty files cannot be mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                for start in range(0, len(view), self.B64_CHUNK_SIZE):
+                    parts.append(pybase64.b64encode_as_string(view[start:start + self.B64_CHUNK_SIZE]))
+        return "".join(parts)
 
     def get_dimensions(self, image_path: str) -> Tuple[int, int]:
         """Get image dimensions (width, height)"""
@@ -112,7 +239,7 @@ class ImageProcessor:
 
     def extract_last_frame(self, video_path: str, output_path: Optional[str] = None, session_id: Optional[str] = None) -> str:
         """
-        Extract the last frame from a video using ffmpeg.
+        Extract the last frame from a video using PyAV (ffmpeg CLI as fallback).
 
         Args:
             video_path: Path to the video file
@@ -142,10 +269,9 @@ class ImageProcessor:
             "video_size_mb": round(video_size / (1024 * 1024), 2),
         })
 
-        # Default output path: same directory, same name with _lastframe.png
-        # Using PNG instead of JPEG to avoid MJPEG encoder issues
+        # Default output path: same directory, same name with _lastframe.jpg
         if output_path is None:
-            output_path = video_path.parent / f"{video_path.stem}_lastframe.png"
+            output_path = video_path.parent / f"{video_path.stem}_lastframe.jpg"
         else:
             output_path = Path(output_path)
 
@@ -154,7 +280,68 @@ class ImageProcessor:
             "output_format": output_path.suffix,
         })
 
-        # Use ffmpeg to extract the last frame as PNG (more reliable than JPEG)
+        # Decode in-process with PyAV, fall back to the ffmpeg CLI
+        if not self._extract_last_frame_av(video_path, output_path):
+            self._extract_last_frame_ffmpeg(video_path, output_path)
+
+        frame_size = output_path.stat().st_size
+        self.logger.success("FRAME_EXTRACT", f"Frame extracted successfully: {output_path}", {
+            "output_path": str(output_path),
+            "frame_size_bytes": frame_size,
+            "frame_size_kb": round(frame_size / 1024, 1),
+        })
+
+        # Verify the image is valid
+        try:
+            with Image.open(output_path) as img:
+                self.logger.success("FRAME_EXTRACT", f"Frame validated: {img.size[0]}x{img.size[1]} {img.mode}", {
+                    "width": img.size[0],
+                    "height": img.size[1],
+                    "mode": img.mode,
+                    "format": img.format,
+                })
+        except Exception as e:
+            self.logger.error("FRAME_EXTRACT", f"Frame validation failed!", error=e)
+            raise RuntimeError(f"Extracted frame is invalid: {e}")
+
+        return str(output_path)
+
+    def _extract_last_frame_av(self, video_path: Path, output_path: Path) -> bool:
+        """Decode the last frame in-process with PyAV, False if PyAV is unavailable or fails"""
+        try:
+            import av
+        except ImportError:
+            return False
+
+        try:
+            with av.open(str(video_path)) as container:
+                stream = container.streams.video[0]
+                # Seek to the keyframe before the last second, then decode to the end
+                if container.duration:
+                    container.seek(max(0, container.duration - av.time_base), backward=True, any_frame=False)
+                last_frame = None
+                for frame in container.decode(stream):
+                    last_frame = frame
+        except (av.error.FFmpegError, IndexError) as e:
+            self.logger.warning("FRAME_EXTRACT", f"PyAV decode failed, falling back to ffmpeg: {e}")
+            return False
+
+        if last_frame is None:
+            self.logger.warning("FRAME_EXTRACT", "PyAV decoded no frames, falling back to ffmpeg")
+            return False
+
+        # JPEG options are ignored for .png output paths and vice versa (low zlib level)
+        last_frame.to_image().save(
+            output_path, quality=self.FRAME_JPEG_QUALITY, subsampling=2, compress_level=1
+        )
+        self.logger.info("FRAME_EXTRACT", "Decoded last frame with PyAV", {
+            "frame_time": last_frame.time,
+            "output_format": output_path.suffix,
+        })
+        return True
+
+    def _extract_last_frame_ffmpeg(self, video_path: Path, output_path: Path):
+        """Extract the last frame with the ffmpeg CLI"""
         # -sseof -1 seeks to 1 second before end (more reliable than -0.1)
         cmd = [
             "ffmpeg", "-y",
@@ -162,13 +349,16 @@ class ImageProcessor:
             "-i", str(video_path),
             "-update", "1",
             "-frames:v", "1",
-            str(output_path)
         ]
+        # Full-range planar YUV keeps the MJPEG encoder happy with any source pix_fmt
+        if output_path.suffix.lower() in (".jpg", ".jpeg"):
+            cmd += ["-q:v", "3", "-pix_fmt", "yuvj420p"]
+        cmd.append(str(output_path))
 
         self.logger.info("FRAME_EXTRACT", f"Running ffmpeg command", {
             "command": " ".join(cmd),
             "sseof_value": "-1",
-            "output_format": "PNG",
+            "output_format": output_path.suffix,
         })
 
         result = subprocess.run(cmd, capture_output=True, text=True)
@@ -194,28 +384,6 @@ class ImageProcessor:
             })
             raise RuntimeError(f"ffmpeg succeeded but output file not created: {output_path}")
 
-        frame_size = output_path.stat().st_size
-        self.logger.success("FRAME_EXTRACT", f"Frame extracted successfully: {output_path}", {
-            "output_path": str(output_path),
-            "frame_size_bytes": frame_size,
-            "frame_size_kb": round(frame_size / 1024, 1),
-        })
-
-        # Verify the image is valid
-        try:
-            with Image.open(output_path) as img:
-                self.logger.success("FRAME_EXTRACT", f"Frame validated: {img.size[0]}x{img.size[1]} {img.mode}", {
-                    "width": img.size[0],
-                    "height": img.size[1],
-                    "mode": img.mode,
-                    "format": img.format,
-                })
-        except Exception as e:
-            self.logger.error("FRAME_EXTRACT", f"Frame validation failed!", error=e)
-            raise RuntimeError(f"Extracted frame is invalid: {e}")
-
-        return str(output_path)
-
 
 # Singleton instance
 image_processor = ImageProcessor()
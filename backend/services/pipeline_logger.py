@@ -8,19 +8,36 @@ Provides:
 - Console output with color coding
 - Automatic context tracking (function, file, line)
 """
-import json
+import asyncio
+import os
+import re
+import sys
 import time
 import traceback
 import functools
 from datetime import datetime
 from typing import Any, Dict, Optional, Callable
-from pathlib import Path
 
+import orjson
 import redis
 
 from config import settings
 
 
+# Shared connection pool, every PipelineLogger instance (one per decorated call) reuses it.
+# Blocking, so concurrent tasks wait for a free connection instead of failing with
+# "Too many connections" once the pool is exhausted
+_REDIS_POOL = redis.BlockingConnectionPool.from_url(
+    settings.redis_url, max_connections=settings.redis_max_connections, timeout=5
+)
+
+LOG_TTL = 86400 * 7  # Keep logs for 7 days
+LOG_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS  # Log data may carry non-str keys (e.g. scene indices)
+
+# Keys whose values are redacted from logged data
+_SENSITIVE_KEY_RE = re.compile(r"key|token|password|secret", re.IGNORECASE)
+
+
 class PipelineLogger:
     """
     Ultra-detailed logger that tracks every step of the pipeline.
@@ -40,11 +57,26 @@ class PipelineLogger:
     }
     RESET = "\033[0m"
 
+    # Numeric severity for level filtering (SUCCESS sits between INFO and WARNING)
+    LEVEL_VALUES = {
+        "DEBUG": 10,
+        "INFO": 20,
+        "SUCCESS": 25,
+        "WARNING": 30,
+        "ERROR": 40,
+        "CRITICAL": 50,
+    }
+
     def __init__(self, session_id: Optional[str] = None):
         self.session_id = session_id or "global"
-        self.redis_client = redis.from_url(settings.redis_url)
+        self.redis_client = redis.Redis(connection_pool=_REDIS_POOL)
         self.start_time = time.time()
         self._step_counter = 0
+        self.min_level = self.LEVEL_VALUES.get(settings.log_level.upper(), 10)
+
+    def is_enabled(self, level: str) -> bool:
+        """Whether logs of this level pass the configured minimum level"""
+        return self.LEVEL_VALUES.get(level, 0) >= self.min_level
 
     def set_session(self, session_id: str):
         """Set session ID for all subsequent logs"""
@@ -55,15 +87,16 @@ class PipelineLogger:
 
     def _get_caller_info(self) -> Dict[str, Any]:
         """Get caller file, function, and line number"""
-        stack = traceback.extract_stack()
-        # Go back through stack to find the actual caller (not this file)
-        for frame in reversed(stack[:-2]):
-            if 'pipeline_logger' not in frame.filename:
-                return {
-                    "file": Path(frame.filename).name,
-                    "function": frame.name,
-                    "line": frame.lineno
-                }
+        # Walk frame by frame to the actual caller (not this file), no full stack extraction
+        frame = sys._getframe(1)
+        while frame is not None and 'pipeline_logger' in frame.f_code.co_filename:
+            frame = frame.f_back
+        if frame is not None:
+            return {
+                "file": os.path.basename(frame.f_code.co_filename),
+                "function": frame.f_code.co_name,
+                "line": frame.f_lineno
+            }
         return {"file": "unknown", "function": "unknown", "line": 0}
 
     def _log(
@@ -75,13 +108,16 @@ class PipelineLogger:
         error: Optional[Exception] = None
     ):
         """Core logging method"""
+        if not self.is_enabled(level):
+            return
+
         self._step_counter += 1
         elapsed = time.time() - self.start_time
         caller = self._get_caller_info()
 
         log_entry = {
             "step": self._step_counter,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcnow(),  # orjson emits the same ISO string as isoformat()
             "elapsed_sec": round(elapsed, 3),
             "level": level,
             "category": category,
@@ -96,29 +132,35 @@ class PipelineLogger:
             log_entry["data"] = sanitized
 
         if error:
+            # Format the passed exception's own traceback, skip it if it was never raised
+            tb = error.__traceback__
             log_entry["error"] = {
                 "type": type(error).__name__,
                 "message": str(error),
-                "traceback": traceback.format_exc()
+                "traceback": "".join(traceback.format_exception(error)) if tb is not None else None
             }
 
-        # Store in Redis
+        # Store in Redis (single round-trip)
         redis_key = f"pipeline_logs:{self.session_id}"
-        self.redis_client.rpush(redis_key, json.dumps(log_entry))
-        self.redis_client.expire(redis_key, 86400 * 7)  # Keep logs for 7 days
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.rpush(redis_key, orjson.dumps(log_entry, default=str, option=LOG_JSON_OPTIONS))
+        pipe.expire(redis_key, LOG_TTL)
+        pipe.execute()
 
         # Console output with color
         color = self.LEVELS.get(level, "")
         location = f"{caller['file']}:{caller['line']}"
 
-        # Format data preview (truncated)
+        # Format data preview (keys only, truncated full data in verbose mode)
         data_preview = ""
-        if data:
-            data_str = json.dumps(data, default=str)
+        if data and settings.log_console_verbose:
+            data_str = orjson.dumps(data, default=str, option=LOG_JSON_OPTIONS).decode()
             if len(data_str) > 200:
                 data_preview = f" | data={data_str[:200]}..."
             else:
                 data_preview = f" | data={data_str}"
+        elif data:
+            data_preview = f" | data_keys={list(data)[:6]}"
 
         error_preview = ""
         if error:
@@ -137,18 +179,23 @@ class PipelineLogger:
     def _sanitize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Remove sensitive data like API keys and base64 images"""
         sanitized = {}
-        for key, value in data.items():
-            if any(k in key.lower() for k in ['key', 'token', 'password', 'secret']):
-                sanitized[key] = "***REDACTED***"
-            elif isinstance(value, str) and len(value) > 1000:
-                # Truncate long strings (like base64 images)
-                sanitized[key] = f"{value[:100]}... [TRUNCATED, len={len(value)}]"
-            elif isinstance(value, dict):
-                sanitized[key] = self._sanitize_data(value)
-            elif isinstance(value, list) and len(value) > 10:
-                sanitized[key] = f"[LIST with {len(value)} items]"
-            else:
-                sanitized[key] = value
+        # Explicit work-list of (source, target) dicts instead of recursion
+        stack = [(data, sanitized)]
+        while stack:
+            source, target = stack.pop()
+            for key, value in source.items():
+                if isinstance(key, str) and _SENSITIVE_KEY_RE.search(key):
+                    target[key] = "***REDACTED***"
+                elif isinstance(value, str) and len(value) > 1000:
+                    # Truncate long strings (like base64 images)
+                    target[key] = f"{value[:100]}... [TRUNCATED, len={len(value)}]"
+                elif isinstance(value, dict):
+                    target[key] = nested = {}
+                    stack.append((value, nested))
+                elif isinstance(value, list) and len(value) > 10:
+                    target[key] = f"[LIST with {len(value)} items]"
+                else:
+                    target[key] = value
         return sanitized
 
     # Convenience methods for different log levels
@@ -205,7 +252,7 @@ class PipelineLogger:
         """Retrieve logs for current session"""
         redis_key = f"pipeline_logs:{self.session_id}"
         logs = self.redis_client.lrange(redis_key, -limit, -1)
-        return [json.loads(log) for log in logs]
+        return [orjson.loads(log) for log in logs]
 
     def get_errors(self) -> list:
         """Get only error logs for current session"""
@@ -242,16 +289,18 @@ def log_function(category: str = "FUNCTION"):
             logger = kwargs.get('_logger') or PipelineLogger()
 
             # Log function entry
-            logger.debug(category, f"ENTER: {func.__name__}", {
-                "args_count": len(args),
-                "kwargs_keys": list(kwargs.keys())
-            })
+            if logger.is_enabled("DEBUG"):
+                logger.debug(category, f"ENTER: {func.__name__}", {
+                    "args_count": len(args),
+                    "kwargs_keys": list(kwargs.keys())
+                })
 
             start = time.time()
             try:
                 result = func(*args, **kwargs)
                 duration = (time.time() - start) * 1000
-                logger.success(category, f"EXIT: {func.__name__} ({duration:.0f}ms)")
+                if logger.is_enabled("SUCCESS"):
+                    logger.success(category, f"EXIT: {func.__name__} ({duration:.0f}ms)")
                 return result
             except Exception as e:
                 duration = (time.time() - start) * 1000
@@ -262,23 +311,24 @@ def log_function(category: str = "FUNCTION"):
         async def async_wrapper(*args, **kwargs):
             logger = kwargs.get('_logger') or PipelineLogger()
 
-            logger.debug(category, f"ENTER: {func.__name__}", {
-                "args_count": len(args),
-                "kwargs_keys": list(kwargs.keys())
-            })
+            if logger.is_enabled("DEBUG"):
+                logger.debug(category, f"ENTER: {func.__name__}", {
+                    "args_count": len(args),
+                    "kwargs_keys": list(kwargs.keys())
+                })
 
             start = time.time()
             try:
                 result = await func(*args, **kwargs)
                 duration = (time.time() - start) * 1000
-                logger.success(category, f"EXIT: {func.__name__} ({duration:.0f}ms)")
+                if logger.is_enabled("SUCCESS"):
+                    logger.success(category, f"EXIT: {func.__name__} ({duration:.0f}ms)")
                 return result
             except Exception as e:
                 duration = (time.time() - start) * 1000
                 logger.error(category, f"FAILED: {func.__name__} ({duration:.0f}ms)", error=e)
                 raise
 
-        import asyncio
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
         return sync_wrapper
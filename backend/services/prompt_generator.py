@@ -64,6 +64,8 @@ class PromptGenerator:
         Product name appears 2-3 times for emphasis.
         """
         parts = []
+        product_lower = product_name.lower()
+        mentions = 1  # Guaranteed product name mentions (positioning part)
 
         # 1. Camera movement and framing
         if scene.camera_movement:
@@ -78,16 +80,18 @@ class PromptGenerator:
         # 3. Person/hand interaction with product (second mention)
         if scene.person_interaction:
             interaction = scene.person_interaction
-            if product_name.lower() not in interaction.lower():
+            if product_lower not in interaction.lower():
                 interaction = f"{interaction} with {product_name}"
             parts.append(interaction)
+            mentions += 1
 
         # 4. Product action/demonstration (third mention if needed)
         if scene.product_action:
             action = scene.product_action
-            if product_name.lower() not in action.lower():
+            if product_lower not in action.lower():
                 action = f"{product_name} {action}"
             parts.append(action)
+            mentions += 1
 
         # 5. Environment
         if scene.environment:
@@ -109,9 +113,8 @@ class PromptGenerator:
         # Combine parts
         prompt = ", ".join(filter(None, parts))
 
-        # Ensure product name appears at least twice
-        product_count = prompt.lower().count(product_name.lower())
-        if product_count < 2:
+        # Ensure product name appears at least twice (only rescan the prompt if not guaranteed)
+        if mentions < 2 and prompt.lower().count(product_lower) < 2:
             prompt = f"{product_name} product video. {prompt}"
 
         return prompt
@@ -126,16 +129,17 @@ class PromptGenerator:
 
         Used when strategy is 'seamless' instead of 'segments'.
         """
-        # Combine key elements from all scenes
-        camera_movements = set()
-        environments = set()
+        # Combine key elements from all scenes (dicts dedupe in scene order, sets would
+        # make the prompt text differ between runs)
+        camera_movements = {}
+        environments = {}
         actions = []
 
         for scene in analysis.scenes:
             if scene.camera_movement:
-                camera_movements.add(scene.camera_movement)
+                camera_movements[scene.camera_movement] = None
             if scene.environment:
-                environments.add(scene.environment)
+                environments[scene.environment] = None
             if scene.product_action:
                 actions.append(scene.product_action)
 
@@ -1,10 +1,12 @@
 import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
-from scenedetect import detect, ContentDetector, split_video_ffmpeg
-from scenedetect.scene_manager import save_images
+from scenedetect import open_video, ContentDetector, SceneManager
+from scenedetect.backends import AVAILABLE_BACKENDS
 
 from config import settings
 
@@ -22,6 +24,10 @@ class Scene:
 class SceneDetector:
     """Detect and split video into scenes using PySceneDetect"""
 
+    SCENE_CACHE_SIZE = 32  # Scene lists kept per detector (oldest evicted first)
+    VIDEO_BACKEND = "pyav"  # Multithreaded decode, OpenCV is used if PyAV is not installed
+    THREADING_MODE = "AUTO"  # PyAV codec thread_type
+
     def __init__(self, threshold: float = 27.0):
         """
         Args:
@@ -29,6 +35,7 @@ class SceneDetector:
         """
         self.threshold = threshold
         self.temp_path = Path(settings.temp_path)
+        self._scene_cache: dict = {}
 
     def detect_scenes(self, video_path: str, session_id: str) -> List[Scene]:
         """
@@ -45,18 +52,17 @@ class SceneDetector:
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # Detect scenes
-        scene_list = detect(video_path, ContentDetector(threshold=self.threshold))
+        scene_list = self._get_scene_list(video_path)
 
         # If no scenes detected, treat whole video as one scene
         if not scene_list:
-            from scenedetect import open_video
             video = open_video(video_path)
             duration = video.duration.get_seconds()
             del video  # VideoStreamCv2 doesn't have release(), just delete it
 
             # Extract single frame from middle
             frame_path = str(output_dir / "scene_001.jpg")
-            self._extract_frame(video_path, duration / 2, frame_path)
+            self._extract_frames(video_path, [duration / 2], [frame_path])
 
             return [Scene(
                 index=0,
@@ -66,22 +72,55 @@ class SceneDetector:
                 frame_path=frame_path
             )]
 
-        # Extract representative frames for each scene
-        scenes = []
-        for i, (start, end) in enumerate(scene_list):
-            start_sec = start.get_seconds()
-            end_sec = end.get_seconds()
-            mid_time = (start_sec + end_sec) / 2
+        boundaries = [(start.get_seconds(), end.get_seconds()) for start, end in scene_list]
+        return self._build_scenes(video_path, boundaries, output_dir)
+
+    def detect_scenes_parallel(
+        self,
+        video_path: str,
+        session_id: str,
+        ranges: List[Tuple[float, float]],
+        workers: Optional[int] = None
+    ) -> List[Scene]:
+        """
+        Detect scene changes within known time ranges concurrently.
+
+        Each range is decoded and scanned by its own worker and the results are
+        concatenated, so every range start also starts a scene.
 
-            frame_path = str(output_dir / f"scene_{i+1:03d}.jpg")
-            self._extract_frame(video_path, mid_time, frame_path)
+        Args:
+            video_path: Path to video file
+            session_id: Session ID for output organization
+            ranges: Ascending, non-overlapping (start, end) ranges in seconds
+            workers: Number of worker threads (default: CPU count)
 
+        Returns:
+            List of Scene objects with timestamps and frame paths
+        """
+        output_dir = self.temp_path / session_id / "scenes"
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            results = executor.map(lambda r: self._detect_range(video_path, *r), ranges)
+            boundaries = [boundary for result in results for boundary in result]
+
+        return self._build_scenes(video_path, boundaries, output_dir)
+
+    def _build_scenes(self, video_path: str, boundaries: List[Tuple[float, float]], output_dir: Path) -> List[Scene]:
+        """Scene objects for (start, end) boundaries in seconds, with their representative frames"""
+        # Representative frame of each scene, extracted in one pass over the video
+        frame_times = [(start_sec + end_sec) / 2 for start_sec, end_sec in boundaries]
+        frame_paths = [str(output_dir / f"scene_{i+1:03d}.jpg") for i in range(len(boundaries))]
+        self._extract_frames(video_path, frame_times, frame_paths)
+
+        scenes = []
+        for i, (start_sec, end_sec) in enumerate(boundaries):
             scenes.append(Scene(
                 index=i,
                 start_time=start_sec,
                 end_time=end_sec,
                 duration=end_sec - start_sec,
-                frame_path=frame_path
+                frame_path=frame_paths[i]
             ))
 
         return scenes
@@ -93,27 +132,138 @@ class SceneDetector:
         Returns:
             List of paths to segment video files
         """
+        return self._split(video_path, self._get_scene_list(video_path), session_id)
+
+    def detect_and_split(self, video_path: str, session_id: str) -> Tuple[List[Scene], List[str]]:
+        """
+        Detect scenes and split the video into segment files with a single detection pass.
+
+        Returns:
+            Tuple of (Scene objects, paths to segment video files)
+        """
+        scenes = self.detect_scenes(video_path, session_id)
+        segment_paths = self._split(video_path, self._get_scene_list(video_path), session_id)
+        return scenes, segment_paths
+
+    def _get_scene_list(self, video_path: str) -> list:
+        """Scene boundaries of a video, detected once per (path, mtime, threshold)"""
+        key = (os.path.abspath(video_path), os.path.getmtime(video_path), self.threshold)
+        scene_list = self._scene_cache.get(key)
+        if scene_list is None:
+            scene_list = self._detect(self._open_video(video_path))
+            if len(self._scene_cache) >= self.SCENE_CACHE_SIZE:
+                self._scene_cache.pop(next(iter(self._scene_cache)))
+            self._scene_cache[key] = scene_list
+        return scene_list
+
+    def _detect_range(self, video_path: str, start: float, end: float) -> List[Tuple[float, float]]:
+        """Scene boundaries (seconds) within one time range, the whole range if it has no cuts"""
+        video = self._open_video(video_path)
+        video.seek(start)
+        # Timecodes stay relative to the video start after seeking, no offset needed
+        scene_list = self._detect(video, end_time=end, start_in_scene=True)
+        return [(s.get_seconds(), e.get_seconds()) for s, e in scene_list]
+
+    def _detect(self, video, end_time: Optional[float] = None, start_in_scene: bool = False) -> list:
+        """Run ContentDetector over an opened video"""
+        scene_manager = SceneManager()
+        # Detect on frames downscaled to ~256px wide (scenedetect's auto factor, 1080p -> 1/7)
+        scene_manager.auto_downscale = True
+        scene_manager.add_detector(ContentDetector(threshold=self.threshold))
+        scene_manager.detect_scenes(video=video, end_time=end_time, show_progress=False)
+        return scene_manager.get_scene_list(start_in_scene=start_in_scene)
+
+    def _open_video(self, video_path: str):
+        """Open a video for detection, with the multithreaded PyAV backend when available"""
+        if self.VIDEO_BACKEND in AVAILABLE_BACKENDS:
+            return open_video(video_path, backend=self.VIDEO_BACKEND, threading_mode=self.THREADING_MODE)
+        return open_video(video_path)
+
+    def _split(self, video_path: str, scene_list: list, session_id: str) -> List[str]:
+        """Split video at the given scene boundaries"""
         output_dir = self.temp_path / session_id / "segments"
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        scene_list = detect(video_path, ContentDetector(threshold=self.threshold))
-
         if not scene_list:
             # No scenes detected, return original video
             return [video_path]
 
-        # Split video at scene boundaries
-        split_video_ffmpeg(
-            video_path,
-            scene_list,
-            output_dir=str(output_dir),
-            output_file_template="$SCENE_NUMBER.mp4"
-        )
+        # Remove segments of an earlier split of this session
+        for stale in output_dir.glob("*.mp4"):
+            stale.unlink()
+
+        # Split video at scene boundaries in one ffmpeg run with the segment muxer.
+        # Keyframes are forced at the cut times, so every scene gets exactly one segment
+        # (same encoder settings as scenedetect's split_video_ffmpeg).
+        cut_times = ",".join(f"{start.get_seconds():.3f}" for start, _ in scene_list[1:])
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", video_path,
+            "-map", "0:v:0", "-map", "0:a?",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "22",
+            "-c:a", "aac",
+        ]
+        if cut_times:
+            cmd += ["-force_key_frames", cut_times]
+        cmd += [
+            "-f", "segment",
+            "-segment_start_number", "1",
+            "-reset_timestamps", "1",
+        ]
+        if cut_times:
+            cmd += ["-segment_times", cut_times]
+        cmd.append(str(output_dir / "%03d.mp4"))
 
-        # Collect output paths
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to split video: {result.stderr}")
+
+        # Collect output paths (one per scene, in scene order)
         segment_paths = sorted(output_dir.glob("*.mp4"))
+        if len(segment_paths) != len(scene_list):
+            raise RuntimeError(f"Split produced {len(segment_paths)} segments for {len(scene_list)} scenes")
         return [str(p) for p in segment_paths]
 
+    def _extract_frames(self, video_path: str, timestamps: List[float], output_paths: List[str]):
+        """Extract frames at ascending timestamps, keeping one PyAV container open for all seeks"""
+        try:
+            import av
+        except ImportError:
+            for timestamp, output_path in zip(timestamps, output_paths):
+                self._extract_frame(video_path, timestamp, output_path)
+            return
+
+        import cv2
+        try:
+            container = av.open(video_path)
+        except av.error.FFmpegError:
+            for timestamp, output_path in zip(timestamps, output_paths):
+                self._extract_frame(video_path, timestamp, output_path)
+            return
+
+        with container:
+            stream = container.streams.video[0]
+            # Scene timestamps start at 0, stream timestamps at the stream's start_time
+            offset = float((stream.start_time or 0) * stream.time_base)
+            for timestamp, output_path in zip(timestamps, output_paths):
+                target = offset + timestamp
+                frame = None
+                try:
+                    # Seek to the keyframe before the target, then decode forward to it
+                    container.seek(int(target / stream.time_base), stream=stream)
+                    for frame in container.decode(stream):
+                        if frame.time is not None and frame.time >= target:
+                            break
+                except av.error.FFmpegError:
+                    frame = None
+
+                if frame is None:
+                    # Seek or decode failed, try the single-frame cv2 path instead
+                    self._extract_frame(video_path, timestamp, output_path)
+                else:
+                    # Target frame, or the last decoded one if EOF came first
+                    cv2.imwrite(output_path, frame.to_ndarray(format="bgr24"))
+
     def _extract_frame(self, video_path: str, timestamp: float, output_path: str):
         """Extract a single frame from video at given timestamp"""
         import cv2
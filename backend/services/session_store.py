@@ -0,0 +1,171 @@
+"""
+Session Store - Batched access to session hashes in Redis
+
+Sessions are stored as Redis hashes under key: session:{session_id}.
+Session ids are tracked in:
+- "sessions" (SET) for membership
+- "sessions:by_created" (ZSET, score = created_at epoch) for paginated listing
+- "sessions:completed" (SET) for the video library
+
+Reads for list views are batched into a single pipelined round-trip.
+All I/O is async (redis.asyncio) so API handlers never block the event loop;
+the Celery worker only uses decode_session and the key constants.
+"""
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+import redis.asyncio as aioredis
+
+from config import settings
+
+
+# Async Redis client for session storage (str responses), shared by the API routes
+redis_client = aioredis.from_url(
+    settings.redis_url,
+    max_connections=settings.redis_max_connections,
+    socket_keepalive=True,
+    health_check_interval=30,
+    decode_responses=True,
+)
+
+SESSIONS_KEY = "sessions"
+SESSIONS_BY_CREATED_KEY = "sessions:by_created"
+COMPLETED_SESSIONS_KEY = "sessions:completed"
+
+
+def session_key(session_id: str) -> str:
+    """Redis key of a session hash"""
+    return f"session:{session_id}"
+
+
+def decode_session(raw: Dict[Union[bytes, str], Union[bytes, str]]) -> dict:
+    """Decode a raw session hash (bytes or str) into a str/JSON dict"""
+    data = {}
+    for k, v in raw.items():
+        if isinstance(v, bytes):
+            k, v = k.decode(), v.decode()
+        data[k] = json.loads(v) if v.startswith(('[', '{')) else v
+    return data
+
+
+async def exists(session_id: str) -> bool:
+    """Whether a session hash exists"""
+    return bool(await redis_client.exists(session_key(session_id)))
+
+
+async def save(session_id: str, data: dict, created_at: datetime):
+    """Store scalar session fields and register the session id"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(session_key(session_id), mapping=data)
+        pipe.sadd(SESSIONS_KEY, session_id)
+        pipe.zadd(SESSIONS_BY_CREATED_KEY, {session_id: created_at.timestamp()})
+        await pipe.execute()
+
+
+async def update(session_id: str, fields: dict):
+    """Set scalar fields on an existing session hash"""
+    await redis_client.hset(session_key(session_id), mapping=fields)
+
+
+async def delete(session_id: str):
+    """Remove a session hash and all index entries"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.delete(session_key(session_id))
+        pipe.srem(SESSIONS_KEY, session_id)
+        pipe.zrem(SESSIONS_BY_CREATED_KEY, session_id)
+        pipe.srem(COMPLETED_SESSIONS_KEY, session_id)
+        await pipe.execute()
+
+
+async def load(session_id: str) -> Optional[dict]:
+    """Load a single session, None if it does not exist"""
+    raw = await redis_client.hgetall(session_key(session_id))
+    return decode_session(raw) if raw else None
+
+
+async def load_many(session_ids: List[str]) -> List[Optional[dict]]:
+    """Load several sessions in one round-trip, None for missing ones"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for sid in session_ids:
+            pipe.hgetall(session_key(sid))
+        results = await pipe.execute()
+    return [decode_session(raw) if raw else None for raw in results]
+
+
+async def list_ids(key: str = SESSIONS_KEY) -> List[str]:
+    """All session ids stored in the given set"""
+    return list(await redis_client.smembers(key))
+
+
+async def scan_ids(key: str, batch_size: int = 100) -> AsyncIterator[List[str]]:
+    """Session ids of the given set in batches, via SSCAN instead of SMEMBERS"""
+    batch = []
+    async for sid in redis_client.sscan_iter(key, count=batch_size):
+        batch.append(sid)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def list_page(offset: int, limit: int) -> List[str]:
+    """Session ids of one page, newest first"""
+    await _backfill_created_index()
+    return await redis_client.zrevrange(SESSIONS_BY_CREATED_KEY, offset, offset + limit - 1)
+
+
+async def count() -> int:
+    """Total number of sessions"""
+    await _backfill_created_index()
+    return await redis_client.zcard(SESSIONS_BY_CREATED_KEY)
+
+
+def _created_score(value: Optional[str]) -> float:
+    """ZSET score of a stored created_at, 0 (listed last) if missing or unparsable"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+async def _backfill_created_index():
+    """
+    Index sessions created before the created_at ZSET existed (runs once).
+
+    The done-flag is only set after the index is complete, so a failed or concurrent
+    run is simply repeated by the next request (ZADD/SADD are idempotent).
+    """
+    flag = f"{SESSIONS_BY_CREATED_KEY}:indexed"
+    if await redis_client.exists(flag):
+        return
+
+    session_ids = await list_ids()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for sid in session_ids:
+            pipe.hget(session_key(sid), "created_at")
+        created = await pipe.execute()
+
+    scores = {sid: _created_score(value) for sid, value in zip(session_ids, created)}
+    if scores:
+        await redis_client.zadd(SESSIONS_BY_CREATED_KEY, scores)
+    await redis_client.set(flag, 1)
+
+
+async def backfill_completed_index():
+    """Index completed sessions created before the completed-sessions set existed (runs once)"""
+    flag = f"{COMPLETED_SESSIONS_KEY}:indexed"
+    if await redis_client.exists(flag):
+        return
+
+    session_ids = await list_ids()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for sid in session_ids:
+            pipe.hget(session_key(sid), "status")
+        statuses = await pipe.execute()
+
+    completed = [sid for sid, status in zip(session_ids, statuses) if status == "completed"]
+    if completed:
+        await redis_client.sadd(COMPLETED_SESSIONS_KEY, *completed)
+    await redis_client.set(flag, 1)
@@ -1,3 +1,4 @@
+import io
 import os
 import shutil
 from abc import ABC, abstractmethod
@@ -74,8 +75,10 @@ class LocalStorageStrategy(StorageStrategy):
         dest_dir = self._get_session_path(session_id)
         dest_path = dest_dir / filename
 
-        # Copy file
-        shutil.copy2(source, dest_path)
+        # Copy file (in-kernel via sendfile on Linux). No hard link: the source may be
+        # rewritten in place later (e.g. variant downloads in the same session folder)
+        if not (dest_path.exists() and os.path.samefile(source, dest_path)):
+            shutil.copy2(source, dest_path)
 
         return StoredVideo(
             session_id=session_id,
@@ -199,7 +202,6 @@ class GoogleDriveStorageStrategy(StorageStrategy):
     def download_video(self, session_id: str, filename: str) -> bytes:
         """Download video from Google Drive (flat structure)"""
         from googleapiclient.http import MediaIoBaseDownload
-        import io
 
         # Find file with session prefix
         full_filename = self._get_full_filename(session_id, filename)
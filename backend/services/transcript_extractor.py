@@ -5,13 +5,17 @@ Uses Gemini's audio understanding to extract accurate transcripts
 with timestamps from video files. This provides much more accurate
 text than general video analysis.
 """
-import json
 import time
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+from itertools import accumulate
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from pydantic import BaseModel, Field
 
 import google.generativeai as genai
+import orjson
 import redis
 
 from config import settings
@@ -49,6 +53,26 @@ class TranscriptResult(BaseModel):
     has_music: bool = Field(description="Whether the video contains music")
     background_sounds: Optional[str] = Field(default=None, description="Description of background sounds")
 
+    @cached_property
+    def segment_index(self) -> Tuple[List[TranscriptSegment], List[float], List[float]]:
+        """Segments sorted by start time, their start times and running max of end times (built once)"""
+        ordered = sorted(self.segments, key=attrgetter("start_time"))
+        starts = [seg.start_time for seg in ordered]
+        max_ends = list(accumulate((seg.end_time for seg in ordered), max))
+        return ordered, starts, max_ends
+
+    def segments_between(self, start_time: float, end_time: float) -> List[TranscriptSegment]:
+        """Segments overlapping a time range, found by bisecting the segment index"""
+        ordered, starts, max_ends = self.segment_index
+        # Segments before lo all end by start_time, segments from hi on start at end_time or later
+        lo = bisect_right(max_ends, start_time)
+        hi = bisect_left(starts, end_time)
+        return [seg for seg in ordered[lo:hi] if seg.end_time > start_time]
+
+    def text_between(self, start_time: float, end_time: float) -> str:
+        """Spoken text overlapping a time range"""
+        return " ".join(seg.text for seg in self.segments_between(start_time, end_time))
+
 
 class TranscriptExtractor:
     """
@@ -102,47 +126,28 @@ class TranscriptExtractor:
             "video_size_mb": round(video_size / (1024 * 1024), 2),
         })
 
-        # Upload video to Gemini
+        # Upload video to Gemini (or reuse the analyzer's upload of the same content)
+        # Imported here: the analyzer itself imports this module
+        from services.gemini_analyzer import gemini_analyzer
+
         self.logger.info("TRANSCRIPT", "Uploading video to Gemini API...")
         upload_start = time.time()
 
         try:
-            video_file = genai.upload_file(video_path)
+            video_digest = gemini_analyzer._video_digest(video_path)
+            video_file = gemini_analyzer._upload_video(video_path, video_digest)
             upload_time = time.time() - upload_start
 
-            self.logger.success("TRANSCRIPT", f"Video uploaded in {upload_time:.1f}s", {
+            self.logger.success("TRANSCRIPT", f"Video ready in {upload_time:.1f}s", {
                 "upload_time_sec": upload_time,
                 "file_name": video_file.name,
                 "file_state": video_file.state.name,
             })
         except Exception as e:
+            # Upload errors, processing timeouts and FAILED files
             self.logger.error("TRANSCRIPT", "Failed to upload video to Gemini", error=e)
             return self._empty_transcript()
 
-        # Wait for processing
-        self.logger.info("TRANSCRIPT", f"Waiting for Gemini to process video (state: {video_file.state.name})...")
-        wait_start = time.time()
-        poll_count = 0
-
-        while video_file.state.name == "PROCESSING":
-            poll_count += 1
-            time.sleep(2)
-            video_file = genai.get_file(video_file.name)
-            self.logger.debug("TRANSCRIPT", f"Poll #{poll_count}: state={video_file.state.name}")
-
-        wait_time = time.time() - wait_start
-        self.logger.info("TRANSCRIPT", f"Processing complete: {video_file.state.name} ({wait_time:.1f}s)", {
-            "final_state": video_file.state.name,
-            "wait_time_sec": wait_time,
-            "poll_count": poll_count,
-        })
-
-        if video_file.state.name == "FAILED":
-            self.logger.error("TRANSCRIPT", f"Gemini processing FAILED", data={
-                "state": video_file.state.name,
-            })
-            return self._empty_transcript()
-
         # Build transcript extraction prompt
         prompt = self._build_transcript_prompt()
         self.logger.info("TRANSCRIPT", f"Sending transcription request to Gemini...", {
@@ -156,11 +161,7 @@ class TranscriptExtractor:
                 contents=[
                     {"role": "user", "parts": [video_file]},
                     {"role": "user", "parts": [prompt]}
-                ],
-                generation_config={
-                    "temperature": 0.1,
-                    "response_mime_type": "application/json",
-                }
+                ]
             )
             generate_time = time.time() - generate_start
 
@@ -173,11 +174,11 @@ class TranscriptExtractor:
             self.logger.info("TRANSCRIPT", "Parsing JSON response...")
 
             try:
-                result_dict = json.loads(response.text)
+                result_dict = orjson.loads(response.text)
                 self.logger.info("TRANSCRIPT", "JSON parsed successfully", {
                     "keys": list(result_dict.keys()),
                 })
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 self.logger.error("TRANSCRIPT", "Failed to parse JSON response", error=e, data={
                     "response_preview": response.text[:500] if response.text else None,
                 })
@@ -294,7 +295,7 @@ Now transcribe the video audio with maximum accuracy."""
 
         # Handle wrapped responses
         if len(result_dict) == 1:
-            key = list(result_dict.keys())[0]
+            key = next(iter(result_dict))
             if isinstance(result_dict[key], dict) and key[0].isupper():
                 self.logger.info("TRANSCRIPT", f"Unwrapping nested response from key: {key}")
                 result_dict = result_dict[key]
@@ -358,13 +359,9 @@ Now transcribe the video audio with maximum accuracy."""
         Returns:
             Transcript text that falls within the time range
         """
-        relevant_segments = []
-        for seg in transcript.segments:
-            # Include segment if it overlaps with the time range
-            if seg.end_time > start_time and seg.start_time < end_time:
-                relevant_segments.append(seg.text)
+        relevant_segments = transcript.segments_between(start_time, end_time)
 
-        result = " ".join(relevant_segments)
+        result = " ".join(seg.text for seg in relevant_segments)
 
         self.logger.debug("TRANSCRIPT", f"Time range [{start_time:.1f}-{end_time:.1f}]: {len(relevant_segments)} segments", {
             "start_time": start_time,
@@ -1,4 +1,5 @@
 import os
+import shutil
 import yt_dlp
 from pathlib import Path
 from typing import Optional
@@ -61,7 +62,6 @@ class VideoDownloader:
 
     def cleanup(self, session_id: str):
         """Remove temporary files for a session"""
-        import shutil
         session_dir = self.temp_path / session_id
         if session_dir.exists():
             shutil.rmtree(session_dir)
@@ -1,7 +1,7 @@
 import httpx
 import asyncio
-import base64
 import time
+import pybase64
 import redis
 from pathlib import Path
 from typing import Optional, Literal
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from config import settings
+from services.image_processor import image_processor
 from services.pipeline_logger import PipelineLogger
 
 
@@ -176,11 +177,10 @@ class VideoGenerator:
         # Priority: start_frame > product_image (start_frame for clip chaining)
         if start_frame_path and Path(start_frame_path).exists():
             with open(start_frame_path, "rb") as f:
-                image_b64 = base64.b64encode(f.read()).decode()
+                image_b64 = pybase64.b64encode_as_string(f.read())
             payload["image"] = f"data:image/jpeg;base64,{image_b64}"
         elif product_image_path and Path(product_image_path).exists():
-            with open(product_image_path, "rb") as f:
-                image_b64 = base64.b64encode(f.read()).decode()
+            image_b64 = image_processor.get_base64(product_image_path)
             payload["image"] = f"data:image/jpeg;base64,{image_b64}"
 
         headers = {
@@ -269,7 +269,7 @@ class VideoGenerator:
 
         # Read and encode start frame
         with open(start_frame_path, "rb") as f:
-            image_b64 = base64.b64encode(f.read()).decode()
+            image_b64 = pybase64.b64encode_as_string(f.read())
         mime_type = "image/png" if start_frame_path.endswith(".png") else "image/jpeg"
 
         payload = {
@@ -381,7 +381,7 @@ class VideoGenerator:
                     "frame_size_bytes": Path(start_frame_path).stat().st_size,
                 })
                 with open(start_frame_path, "rb") as f:
-                    image_b64 = base64.b64encode(f.read()).decode()
+                    image_b64 = pybase64.b64encode_as_string(f.read())
                 # Detect MIME type from extension
                 mime_type = "image/png" if start_frame_path.endswith(".png") else "image/jpeg"
                 payload["input_reference"] = f"data:{mime_type};base64,{image_b64}"
@@ -396,8 +396,7 @@ class VideoGenerator:
                     "image_size_bytes": Path(product_image_path).stat().st_size,
                     "reason": "No start_frame available, falling back to product image"
                 })
-                with open(product_image_path, "rb") as f:
-                    image_b64 = base64.b64encode(f.read()).decode()
+                image_b64 = image_processor.get_base64(product_image_path)
                 # Detect MIME type from extension
                 mime_type = "image/png" if product_image_path.endswith(".png") else "image/jpeg"
                 payload["input_reference"] = f"data:{mime_type};base64,{image_b64}"
@@ -434,12 +433,11 @@ class VideoGenerator:
             if start_frame_path and Path(start_frame_path).exists():
                 self.logger.info("DEFAPI_VEO", f"Using START FRAME: {start_frame_path}")
                 with open(start_frame_path, "rb") as f:
-                    image_b64 = base64.b64encode(f.read()).decode()
+                    image_b64 = pybase64.b64encode_as_string(f.read())
                 payload["image"] = f"data:image/jpeg;base64,{image_b64}"
             elif product_image_path and Path(product_image_path).exists():
                 self.logger.info("DEFAPI_VEO", f"Using PRODUCT IMAGE: {product_image_path}")
-                with open(product_image_path, "rb") as f:
-                    image_b64 = base64.b64encode(f.read()).decode()
+                image_b64 = image_processor.get_base64(product_image_path)
                 payload["image"] = f"data:image/jpeg;base64,{image_b64}"
             cost = 0.50  # $0.5 per request
 
@@ -15,6 +15,7 @@ from services.storage_manager import StorageManager
 from services.image_processor import image_processor
 from services.clip_segmenter import clip_segmenter
 from services.pipeline_logger import PipelineLogger
+from services.session_store import decode_session, COMPLETED_SESSIONS_KEY
 
 # Initialize Celery
 celery_app = Celery(
@@ -52,19 +53,23 @@ def update_job_status(
         "error": error,
         **extra_data
     }
-    redis_client.hset(f"session:{session_id}", mapping={
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(f"session:{session_id}", mapping={
         k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
         for k, v in data.items() if v is not None
     })
+    # Keep the completed-sessions index in sync with status transitions
+    if status == "completed":
+        pipe.sadd(COMPLETED_SESSIONS_KEY, session_id)
+    else:
+        pipe.srem(COMPLETED_SESSIONS_KEY, session_id)
+    pipe.execute()
 
 
 def get_session_data(session_id: str) -> dict:
     """Get session data from Redis"""
     data = redis_client.hgetall(f"session:{session_id}")
-    return {
-        k.decode(): json.loads(v) if v.decode().startswith(('[', '{')) else v.decode()
-        for k, v in data.items()
-    }
+    return decode_session(data)
 
 
 @celery_app.task(bind=True, max_retries=3)
@@ -77,11 +82,14 @@ def process_video_pipeline(
     num_variants: int,
     provider: str,
     model: str,
-    strategy: str
+    strategy: str,
+    use_cache: bool = True
 ):
     """
     Main video processing pipeline.
 
+    use_cache=False skips stored Gemini analysis results (regenerating a session).
+
     Steps:
     1. Download TikTok video
     2. Detect scenes
@@ -244,7 +252,8 @@ def process_video_pipeline(
             video_path,
             product_name,
             clip_segments_dict,
-            target_model=target_model
+            target_model=target_model,
+            use_cache=use_cache
         )
 
         logger.pipeline_step("GEMINI_ANALYSIS", "completed", {